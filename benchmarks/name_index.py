@@ -0,0 +1,57 @@
+import argparse
+import random
+import string
+import time
+from collections.abc import Callable
+
+from once_human.name_index import NameIndex
+
+SIZES = (100, 1000, 10000)
+DEADLINE_MS = 3000
+
+
+def synthetic_names(size: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    names: set[str] = set()
+    while len(names) < size:
+        words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(rng.randint(1, 3))]
+        names.add(" ".join(words).title())
+    return sorted(names)
+
+
+def typo(name: str, rng: random.Random) -> str:
+    i = rng.randrange(len(name))
+    return name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1 :]
+
+
+def _per_call(func: Callable[[str], object], queries: list[str]) -> float:
+    started = time.perf_counter()
+    for query in queries:
+        func(query)
+    return (time.perf_counter() - started) / len(queries) * 1e6
+
+
+def bench(iterations: int) -> None:
+    print(f"{'entries':>8} {'build ms':>9} {'prefix us':>10} {'typo us':>9} {'search us':>10} {'worst us':>9}")
+    rng = random.Random(1)
+    for size in SIZES:
+        names = synthetic_names(size)
+        started = time.perf_counter()
+        index = NameIndex((name, i) for i, name in enumerate(names))
+        build_ms = (time.perf_counter() - started) * 1000
+        prefixes = [rng.choice(names)[: rng.randint(1, 4)] for _ in range(iterations)]
+        typos = [typo(rng.choice(names), rng) for _ in range(iterations)]
+        keystrokes = [name[:i] for name in rng.sample(names, min(size, iterations)) for i in range(len(name) + 1)]
+        prefix_us = _per_call(lambda query: index.prefix(query, 25), prefixes)
+        typo_us = _per_call(lambda query: index.similar(query, 25), typos)
+        search_us = _per_call(index.search, keystrokes)
+        worst_us = max(_per_call(index.search, [query]) for query in keystrokes[:iterations])
+        print(f"{size:>8} {build_ms:>9.1f} {prefix_us:>10.1f} {typo_us:>9.1f} {search_us:>10.1f} {worst_us:>9.1f}")
+    print(f"discord autocomplete deadline: {DEADLINE_MS} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure autocomplete name index build and lookup cost")
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+    bench(args.iterations)
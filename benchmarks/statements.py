@@ -0,0 +1,124 @@
+import argparse
+import asyncio
+import time
+from collections.abc import Callable
+
+from sqlalchemy import and_
+from sqlalchemy import Select
+from sqlalchemy import select
+from sqlalchemy import tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm import selectinload
+
+from once_human import repository
+from once_human.models import Player
+from once_human.models import PlayerSpecialization
+from once_human.models import scenario_specializations
+from once_human.models import Server
+from once_human.models import Specialization
+from once_human.models import SpecializationLevel
+
+DIALECT = postgresql.dialect()
+
+
+def adhoc_user_players(guild_id: int, user_id: int) -> Select:
+    return (
+        select(Player)
+        .where(Player.guild_id == guild_id, Player.user_id == user_id)
+        .order_by(Player.lower_name)
+        .options(selectinload(Player.player_specializations).selectinload(PlayerSpecialization.specialization))
+    )
+
+
+def adhoc_servers() -> Select:
+    return select(Server).order_by(Server.name).options(selectinload(Server.scenario))
+
+
+def adhoc_scenario_specs(scenario_id: int) -> Select:
+    return (
+        select(SpecializationLevel.level, Specialization)
+        .join(Specialization, Specialization.id == SpecializationLevel.specialization_id)
+        .join(scenario_specializations, scenario_specializations.c.specialization_id == Specialization.id)
+        .where(scenario_specializations.c.scenario_id == scenario_id)
+        .order_by(SpecializationLevel.level, Specialization.lower_name)
+    )
+
+
+def adhoc_server_players(guild_id: int, server_id: int, player_id: int) -> Select:
+    return (
+        select(Player)
+        .where(
+            and_(
+                Player.guild_id == guild_id,
+                Player.server_id == server_id,
+                Player.id != player_id,
+                tuple_(Player.lower_name, Player.id) > tuple_("", -1),
+            )
+        )
+        .order_by(Player.lower_name, Player.id)
+        .limit(26)
+        .options(load_only(Player.id, Player.name))
+    )
+
+
+QUERIES: dict[str, tuple[Callable[[], Select], Select, dict]] = {
+    "user_players": (
+        lambda: adhoc_user_players(1, 1),
+        repository.USER_PLAYERS_STMT,
+        {"guild_id": 1, "user_id": 1},
+    ),
+    "servers": (adhoc_servers, repository.SERVERS_STMT, {}),
+    "specs_by_level": (lambda: adhoc_scenario_specs(1), repository.SCENARIO_SPECS_STMT, {"scenario_id": 1}),
+    "other_server_players": (
+        lambda: adhoc_server_players(1, 1, 1),
+        repository.SERVER_PLAYERS_STMT,
+        {"guild_id": 1, "server_id": 1, "player_id": 1, "after_name": "", "after_id": -1, "limit": 26},
+    ),
+}
+
+
+def _per_call(func: Callable[[], object], iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def bench_compile(iterations: int) -> None:
+    print(f"{'query':<22} {'build us':>9} {'cache key us':>13} {'compile us':>11} {'prebuilt key us':>16}")
+    for name, (build, prebuilt, _) in QUERIES.items():
+        stmt = build()
+        build_us = _per_call(build, iterations)
+        key_us = _per_call(stmt._generate_cache_key, iterations)
+        compile_us = _per_call(lambda: stmt.compile(dialect=DIALECT), iterations)
+        prebuilt_key_us = _per_call(prebuilt._generate_cache_key, iterations)
+        print(f"{name:<22} {build_us:>9.1f} {key_us:>13.1f} {compile_us:>11.1f} {prebuilt_key_us:>16.1f}")
+
+
+async def bench_execute(iterations: int) -> None:
+    from once_human import database
+
+    print(f"{'query':<22} {'adhoc ms':>9} {'prebuilt ms':>12}")
+    async with database.AsyncSessionFactory() as session:
+        for name, (build, prebuilt, params) in QUERIES.items():
+            timings = []
+            for stmt, stmt_params in [(None, {}), (prebuilt, params)]:
+                await session.execute(stmt if stmt is not None else build(), stmt_params)
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    await session.execute(stmt if stmt is not None else build(), stmt_params)
+                timings.append((time.perf_counter() - started) / iterations * 1000)
+                session.expunge_all()
+            print(f"{name:<22} {timings[0]:>9.3f} {timings[1]:>12.3f}")
+    await database.engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare statement build/compile cost with execution cost")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--execute", action="store_true", help="also execute against the configured database")
+    args = parser.parse_args()
+    bench_compile(args.iterations)
+    if args.execute:
+        asyncio.run(bench_execute(args.iterations // 10 or 1))
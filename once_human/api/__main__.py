@@ -0,0 +1,7 @@
+from aiohttp import web
+
+from once_human.api.server import ApiServer
+from once_human.config import config
+
+if __name__ == "__main__":
+    web.run_app(ApiServer().app, host=config.api.host, port=config.api.port)
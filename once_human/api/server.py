@@ -0,0 +1,164 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import time
+from typing import Optional
+
+from aiohttp import web
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from once_human import database
+from once_human import export
+from once_human import repository
+from once_human.cache import LRUCache
+from once_human.catalog import catalog
+from once_human.config import config
+from once_human.repository import PlayerCursor
+
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(cursor: PlayerCursor) -> str:
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+
+
+def decode_cursor(value: Optional[str]) -> Optional[PlayerCursor]:
+    if not value:
+        return None
+    try:
+        lower_name, player_id = json.loads(base64.urlsafe_b64decode(value.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        raise web.HTTPBadRequest(text="Invalid cursor")
+    # cursors come back from clients, a wrong type would only fail inside the query
+    if not isinstance(lower_name, str) or type(player_id) is not int or not -(2**31) <= player_id < 2**31:
+        raise web.HTTPBadRequest(text="Invalid cursor")
+    return lower_name, player_id
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def json_response(request: web.Request, body: bytes, etag: str, max_age: float) -> web.Response:
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={int(max_age)}"}
+    if _etag_matches(request.headers.get("If-None-Match", None), etag):
+        return web.Response(status=304, headers=headers)
+    return web.Response(body=body, content_type="application/json", headers=headers)
+
+
+class ApiServer:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = database.AsyncSessionFactory,
+        *,
+        players_ttl: float = config.api.players_ttl,
+        page_size: int = config.api.page_size,
+        export_token: str = config.api.export_token,
+    ) -> None:
+        self.session_factory = session_factory
+        self.players_ttl = players_ttl
+        self.page_size = page_size
+        self.export_token = export_token
+        self.players_cache: LRUCache[tuple, tuple[float, bytes, str]] = LRUCache(1024, name="api_players")
+        self.app = web.Application()
+        self.app.add_routes(
+            [
+                web.get("/scenarios", self.catalog_handler("scenarios")),
+                web.get("/servers", self.catalog_handler("servers")),
+                web.get("/specializations", self.catalog_handler("specializations")),
+                web.get("/guilds/{guild_id}/servers/{server_id}/players", self.server_players),
+                web.get("/export", self.export),
+            ]
+        )
+        self._runner: Optional[web.AppRunner] = None
+
+    def catalog_handler(self, name: str):
+        async def handler(request: web.Request) -> web.Response:
+            snapshot = await catalog.get(self.session_factory)
+            serialized = snapshot.serialized[name]
+            return json_response(request, serialized.body, serialized.etag, catalog.ttl)
+
+        return handler
+
+    async def server_players(self, request: web.Request) -> web.Response:
+        try:
+            guild_id = int(request.match_info["guild_id"])
+            server_id = int(request.match_info["server_id"])
+            limit = max(1, min(int(request.query.get("limit", self.page_size)), MAX_PAGE_SIZE))
+        except ValueError:
+            raise web.HTTPBadRequest(text="Invalid guild id, server id or limit")
+        snapshot = await catalog.get(self.session_factory)
+        if server_id not in snapshot.servers:
+            raise web.HTTPNotFound(text="Unknown server")
+        cursor = request.query.get("cursor", None)
+        key = (guild_id, server_id, cursor, limit)
+        cached = self.players_cache.get(key)
+        if cached is None or time.monotonic() - cached[0] > self.players_ttl:
+            body = await self._load_players(guild_id, server_id, decode_cursor(cursor), limit)
+            cached = (time.monotonic(), body, f'"{hashlib.sha1(body).hexdigest()[:16]}"')
+            self.players_cache.put(key, cached)
+        _, body, etag = cached
+        return json_response(request, body, etag, self.players_ttl)
+
+    async def _load_players(self, guild_id: int, server_id: int, after: Optional[PlayerCursor], limit: int) -> bytes:
+        async with self.session_factory() as session:
+            rows = await repository.server_players_page(session, guild_id, server_id, after=after, limit=limit + 1)
+            page = rows[:limit]
+            builds = await repository.player_builds(session, [player_id for player_id, _, _ in page])
+        players = [
+            {"id": player_id, "name": name, "build": {str(level): spec for level, spec in builds[player_id].items()}}
+            for player_id, name, _ in page
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            player_id, _, lower_name = page[-1]
+            next_cursor = encode_cursor((lower_name, player_id))
+        return json.dumps({"players": players, "next": next_cursor}, separators=(",", ":")).encode()
+
+    def _check_export_token(self, request: web.Request) -> None:
+        if not self.export_token:
+            raise web.HTTPNotFound()
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(token.encode(), self.export_token.encode()):
+            raise web.HTTPUnauthorized(text="Invalid token", headers={"WWW-Authenticate": "Bearer"})
+
+    async def export(self, request: web.Request) -> web.StreamResponse:
+        self._check_export_token(request)
+        fmt = request.query.get("format", "csv")
+        if fmt not in export.EXPORT_FORMATS:
+            raise web.HTTPBadRequest(text=f"format must be one of {', '.join(export.EXPORT_FORMATS)}")
+        if "guild_id" not in request.query:
+            raise web.HTTPBadRequest(text="guild_id is required")
+        try:
+            filters = {
+                key: int(request.query[key]) for key in ("guild_id", "server_id", "scenario_id") if key in request.query
+            }
+        except ValueError:
+            raise web.HTTPBadRequest(text="Invalid guild_id, server_id or scenario_id")
+        stream = web.StreamResponse(
+            headers={
+                "Content-Type": "application/gzip",
+                "Content-Disposition": f'attachment; filename="{export.export_filename(fmt)}"',
+            }
+        )
+        await stream.prepare(request)
+        async with self.session_factory() as session:
+            async for chunk in export.export_chunks(session, fmt, **filters):
+                await stream.write(chunk)
+        await stream.write_eof()
+        return stream
+
+    async def start(self, host: str = config.api.host, port: int = config.api.port) -> None:
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,206 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from dataclasses import replace
+from typing import Optional
+
+import discord
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from once_human import metrics
+from once_human import repository
+from once_human.bot.guilds import guild_settings
+from once_human.catalog import catalog
+from once_human.catalog import CatalogSnapshot
+from once_human.config import config
+from once_human.models import Player
+
+DESCRIPTION_MAX = 4096
+
+announcement_events = metrics.Counter(
+    "once_human_announcement_events_total", "Build change events by outcome", ("outcome",)
+)
+
+
+@dataclass(frozen=True)
+class BuildChange:
+    guild_id: int
+    server_id: int
+    player_id: int
+    player_name: str
+    old: dict[int, int]
+    new: dict[int, int]
+
+
+def _merge(changes: list[BuildChange]) -> list[BuildChange]:
+    # a player saving several times in one window is reported once, from the first old build to the last new one
+    merged: dict[tuple[int, int], BuildChange] = {}
+    for change in changes:
+        key = (change.server_id, change.player_id)
+        first = merged.get(key, None)
+        merged[key] = change if first is None else replace(change, old=first.old)
+    return [change for change in merged.values() if change.old != change.new]
+
+
+def _change_line(change: BuildChange, snapshot: CatalogSnapshot) -> str:
+    def spec_name(spec_id: Optional[int]) -> str:
+        spec = snapshot.specializations.get(spec_id, None) if spec_id is not None else None
+        return spec.name if spec else "empty"
+
+    levels = sorted({*change.old, *change.new})
+    diffs = [
+        f"level {level} {spec_name(change.old.get(level))} → {spec_name(change.new.get(level))}"
+        for level in levels
+        if change.old.get(level) != change.new.get(level)
+    ]
+    return f"* **{change.player_name}**: {', '.join(diffs)}"
+
+
+class AnnouncementPipeline:
+    def __init__(self, *, queue_size: int = 1000, window: float = 30, min_interval: float = 5) -> None:
+        self.window = window
+        self.min_interval = min_interval
+        self.queue: asyncio.Queue[BuildChange] = asyncio.Queue(maxsize=queue_size)
+        self._client: Optional[discord.Client] = None
+        self._session_factory: Optional[async_sessionmaker] = None
+        self._task: Optional[asyncio.Task] = None
+        self._sends: set[asyncio.Task] = set()
+        self._channel_locks: dict[int, asyncio.Lock] = {}
+        self._next_send: dict[int, float] = {}
+
+    def publish(self, change: BuildChange) -> None:
+        if change.old == change.new:
+            return
+        try:
+            self.queue.put_nowait(change)
+        except asyncio.QueueFull:
+            announcement_events.inc("dropped")
+        else:
+            announcement_events.inc("queued")
+
+    def start(self, client: discord.Client, session_factory: async_sessionmaker) -> None:
+        self._client = client
+        self._session_factory = session_factory
+        self._task = asyncio.create_task(self.run())
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+        for task in self._sends:
+            task.cancel()
+
+    async def _collect(self) -> list[BuildChange]:
+        changes = [await self.queue.get()]
+        deadline = time.monotonic() + self.window
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                changes.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except TimeoutError:
+                break
+        return changes
+
+    async def run(self) -> None:
+        while True:
+            changes = await self._collect()
+            by_guild: dict[int, list[BuildChange]] = {}
+            for change in _merge(changes):
+                by_guild.setdefault(change.guild_id, []).append(change)
+            for guild_id, guild_changes in by_guild.items():
+                channel_id = guild_settings.get(guild_id).announcement_channel
+                if channel_id is None:
+                    announcement_events.inc("unrouted", amount=len(guild_changes))
+                    continue
+                try:
+                    embed = await self._digest(guild_id, guild_changes)
+                except Exception:
+                    announcement_events.inc("failed", amount=len(guild_changes))
+                    continue
+                self.post(channel_id, embed, len(guild_changes))
+
+    def post(self, channel_id: int, embed: discord.Embed, count: int = 1) -> None:
+        task = asyncio.create_task(self._send(channel_id, embed, count))
+        self._sends.add(task)
+        task.add_done_callback(self._sends.discard)
+
+    async def _coverage_lines(
+        self, guild_id: int, server_id: int, changes: list[BuildChange], snapshot: CatalogSnapshot
+    ) -> list[str]:
+        removed: set[tuple[int, int]] = set()
+        added: dict[tuple[int, int], int] = {}
+        for change in changes:
+            old, new = set(change.old.items()), set(change.new.items())
+            removed.update(old - new)
+            for pair in new - old:
+                added[pair] = added.get(pair, 0) + 1
+        async with self._session_factory() as session:
+            holders = await repository.server_spec_holder_counts(session, guild_id, server_id, [*removed, *added])
+
+        server = snapshot.servers.get(server_id, None)
+        server_name = server.name if server else f"Server {server_id}"
+        lines: list[str] = []
+        for level, spec_id in sorted(removed):
+            if not holders.get((level, spec_id), 0):
+                spec = snapshot.specializations.get(spec_id, None)
+                lines.append(f"* {server_name} now has nobody with {spec.name if spec else spec_id} at level {level}")
+        for (level, spec_id), count in sorted(added.items()):
+            # everyone holding it arrived in this window, so nobody did before
+            if (level, spec_id) not in removed and holders.get((level, spec_id), 0) == count:
+                spec = snapshot.specializations.get(spec_id, None)
+                lines.append(f"* {server_name} now covers {spec.name if spec else spec_id} at level {level}")
+        return lines
+
+    async def _digest(self, guild_id: int, changes: list[BuildChange]) -> discord.Embed:
+        snapshot = await catalog.get(self._session_factory)
+        by_server: dict[int, list[BuildChange]] = {}
+        for change in changes:
+            by_server.setdefault(change.server_id, []).append(change)
+
+        lines: list[str] = []
+        coverage: list[str] = []
+        for server_id, server_changes in by_server.items():
+            server = snapshot.servers.get(server_id, None)
+            lines.append(f"__{server.name if server else f'Server {server_id}'}__")
+            lines.extend(_change_line(change, snapshot) for change in server_changes)
+            coverage.extend(await self._coverage_lines(guild_id, server_id, server_changes, snapshot))
+        if coverage:
+            lines.extend(["", "__Coverage__", *coverage])
+        description = "\n".join(lines)
+        if len(description) > DESCRIPTION_MAX:
+            description = description[: DESCRIPTION_MAX - 3] + "..."
+        return discord.Embed(title="Build changes", description=description)
+
+    async def _send(self, channel_id: int, embed: discord.Embed, count: int) -> None:
+        lock = self._channel_locks.setdefault(channel_id, asyncio.Lock())
+        async with lock:
+            delay = self._next_send.get(channel_id, 0) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                channel = self._client.get_channel(channel_id) or await self._client.fetch_channel(channel_id)
+                await channel.send(embed=embed)
+            except discord.HTTPException:
+                announcement_events.inc("failed", amount=count)
+            else:
+                announcement_events.inc("sent", amount=count)
+            finally:
+                self._next_send[channel_id] = time.monotonic() + self.min_interval
+
+
+announcer: Optional[AnnouncementPipeline] = None
+if config.announcements.enabled:
+    announcer = AnnouncementPipeline(
+        queue_size=config.announcements.queue_size,
+        window=config.announcements.window,
+        min_interval=config.announcements.min_interval,
+    )
+
+
+def player_change(player: Player, old: dict[int, int], new: dict[int, int]) -> Optional[BuildChange]:
+    if player.server_id is None or old == new:
+        return None
+    return BuildChange(player.guild_id, player.server_id, player.id, player.name, old, new)
+
+
+def announce(change: Optional[BuildChange]) -> None:
+    if announcer and change:
+        announcer.publish(change)
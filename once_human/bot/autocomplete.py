@@ -0,0 +1,27 @@
+import discord
+from discord import app_commands
+
+from once_human import database
+from once_human.catalog import catalog
+from once_human.name_index import catalog_names
+from once_human.name_index import NameIndex
+
+type Choices = list[app_commands.Choice[str]]
+
+
+def _choices(index: NameIndex, current: str) -> Choices:
+    # answered from memory only; a stale catalog reloads in the background for the next keystroke
+    catalog.refresh(database.AsyncSessionFactory)
+    return [app_commands.Choice(name=name, value=name) for name in index.search(current)]
+
+
+async def scenario_autocomplete(interaction: discord.Interaction, current: str) -> Choices:
+    return _choices(catalog_names.scenarios, current)
+
+
+async def server_autocomplete(interaction: discord.Interaction, current: str) -> Choices:
+    return _choices(catalog_names.servers, current)
+
+
+async def specialization_autocomplete(interaction: discord.Interaction, current: str) -> Choices:
+    return _choices(catalog_names.specializations, current)
@@ -1,24 +1,34 @@
 import discord
 from discord import app_commands
 
-from once_human.config import config
+from once_human.bot.guilds import guild_settings
+
+
+def _has_role(interaction: discord.Interaction, role_id: int) -> bool:
+    return isinstance(interaction.user, discord.Member) and interaction.user.get_role(role_id) is not None
 
 
 def is_admin():
-    def is_guild_owner(interaction: discord.Interaction) -> bool:
+    def predicate(interaction: discord.Interaction) -> bool:
+        if interaction.guild is None:
+            raise app_commands.NoPrivateMessage()
+        admin_role = guild_settings.get(interaction.guild_id).admin_role
+        if admin_role:
+            if not _has_role(interaction, admin_role):
+                raise app_commands.MissingRole(admin_role)
+            return True
         return interaction.user.id == interaction.guild.owner_id
 
-    if config.discord.admin_role:
-        return app_commands.checks.has_role(config.discord.admin_role)
-    else:
-        return app_commands.check(is_guild_owner)
+    return app_commands.check(predicate)
 
 
 def is_user():
-    def always_true(interaction: discord.Interaction) -> bool:
+    def predicate(interaction: discord.Interaction) -> bool:
+        if interaction.guild is None:
+            raise app_commands.NoPrivateMessage()
+        user_role = guild_settings.get(interaction.guild_id).user_role
+        if user_role and not _has_role(interaction, user_role):
+            raise app_commands.MissingRole(user_role)
         return True
 
-    if config.discord.user_role:
-        return app_commands.checks.has_role(config.discord.user_role)
-    else:
-        return app_commands.check(always_true)
+    return app_commands.check(predicate)
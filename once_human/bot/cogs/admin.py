@@ -1,20 +1,141 @@
+import tempfile
+from typing import Literal
+from typing import Optional
+
 import discord
 from discord import app_commands
 from discord.ext import commands
+from sqlalchemy.exc import IntegrityError
 
+from once_human import database
+from once_human import export
+from once_human import repository
+from once_human.bot.autocomplete import scenario_autocomplete
+from once_human.bot.autocomplete import server_autocomplete
 from once_human.bot.checks import is_admin
 from once_human.bot.cogs.base import BaseCog
+from once_human.bot.guilds import guild_settings
+from once_human.bot.ui.views.diagnostics import DiagnosticsView
 from once_human.bot.utils import response
+from once_human.models import Guild
+
+DEFAULT_FILE_SIZE_LIMIT = 25 * 1024 * 1024
 
 
 class AdminCog(BaseCog, name="admin"):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-    @app_commands.command()
+    @app_commands.command(description="Live diagnostics for views, the database pool, caches and Discord")
     @is_admin()
     async def oh(self, interaction: discord.Interaction):
-        await response(interaction).send_message("admin commands", ephemeral=True, delete_after=5)
+        await response(interaction).defer(ephemeral=True)
+        async with database.AsyncSessionFactory() as session:
+            view = await DiagnosticsView.create(interaction, session, bot=self.bot)
+            await view.refresh()
+            await view.wait()
+
+    @app_commands.command(description="Configure roles and the announcement channel for this server")
+    @is_admin()
+    async def configure(
+        self,
+        interaction: discord.Interaction,
+        announcement_channel: Optional[discord.TextChannel] = None,
+        user_role: Optional[discord.Role] = None,
+        admin_role: Optional[discord.Role] = None,
+    ):
+        async with database.AsyncSessionFactory() as session:
+            guild = await session.get(Guild, interaction.guild_id)
+            if guild is None:
+                guild = Guild(id=interaction.guild_id)
+                session.add(guild)
+            if announcement_channel:
+                guild.announcement_channel = announcement_channel.id
+            if user_role:
+                guild.user_role = user_role.id
+            if admin_role:
+                guild.admin_role = admin_role.id
+            await session.commit()
+        guild_settings.update(guild)
+        await response(interaction).send_message("Configuration updated", ephemeral=True, delete_after=5)
+
+    @app_commands.command(description="Export every player's build")
+    @app_commands.describe(fmt="File format", server="Only players on this server", scenario="Only this scenario")
+    @app_commands.rename(fmt="format")
+    @app_commands.autocomplete(server=server_autocomplete, scenario=scenario_autocomplete)
+    @is_admin()
+    async def export(
+        self,
+        interaction: discord.Interaction,
+        fmt: Literal["csv", "ndjson"] = "csv",
+        server: Optional[str] = None,
+        scenario: Optional[str] = None,
+    ):
+        await response(interaction).defer(ephemeral=True)
+        filters: dict[str, int] = {"guild_id": interaction.guild_id}
+        async with database.AsyncSessionFactory() as session:
+            if server:
+                db_server = await repository.server_by_name(session, server)
+                if db_server is None:
+                    await interaction.followup.send(f"Unknown server **{server}**", ephemeral=True)
+                    return
+                filters["server_id"] = db_server.id
+            if scenario:
+                db_scenario = await repository.scenario_by_name(session, scenario)
+                if db_scenario is None:
+                    await interaction.followup.send(f"Unknown scenario **{scenario}**", ephemeral=True)
+                    return
+                filters["scenario_id"] = db_scenario.id
+            with tempfile.TemporaryFile() as fp:
+                async for chunk in export.export_chunks(session, fmt, **filters):
+                    fp.write(chunk)
+                size = fp.tell()
+                limit = interaction.guild.filesize_limit if interaction.guild else DEFAULT_FILE_SIZE_LIMIT
+                if size > limit:
+                    await interaction.followup.send(
+                        f"Export is {size} bytes, over the {limit} byte upload limit", ephemeral=True
+                    )
+                    return
+                fp.seek(0)
+                await interaction.followup.send(file=discord.File(fp, export.export_filename(fmt)), ephemeral=True)
+
+    @app_commands.command(description="Bring back a member's archived players")
+    @app_commands.describe(member="Owner of the players", player="Only this player, all of them when empty")
+    @is_admin()
+    async def restore(self, interaction: discord.Interaction, member: discord.Member, player: Optional[str] = None):
+        await response(interaction).defer(ephemeral=True)
+        async with database.AsyncSessionFactory(info={"primary": True}) as session:
+            try:
+                names = await repository.restore_players(session, interaction.guild_id, member.id, player)
+                await session.commit()
+            except IntegrityError:
+                await interaction.followup.send(
+                    f"{member.display_name} already has an active player with an archived player's name, "
+                    "rename it first",
+                    ephemeral=True,
+                )
+                return
+        if not names:
+            await interaction.followup.send(f"No archived players for {member.display_name}", ephemeral=True)
+            return
+        await interaction.followup.send(
+            f"Restored {', '.join(f'**{name}**' for name in names)} for {member.display_name}", ephemeral=True
+        )
+
+    @app_commands.command(description="Retire a server so its players get archived, or bring it back")
+    @app_commands.describe(server="Server name", retired="Whether the server is retired")
+    @app_commands.autocomplete(server=server_autocomplete)
+    @is_admin()
+    async def retire(self, interaction: discord.Interaction, server: str, retired: bool = True):
+        async with database.AsyncSessionFactory(info={"primary": True}) as session:
+            db_server = await repository.server_by_name(session, server)
+            if db_server is None:
+                await response(interaction).send_message(f"Unknown server **{server}**", ephemeral=True, delete_after=5)
+                return
+            db_server.retired = retired
+            await session.commit()
+        state = "retired" if retired else "active"
+        await response(interaction).send_message(f"**{db_server.name}** is now {state}", ephemeral=True, delete_after=5)
 
 
 async def setup(bot: commands.Bot):
@@ -0,0 +1,92 @@
+import asyncio
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from once_human import database
+from once_human import optimizer
+from once_human import repository
+from once_human.bot.autocomplete import server_autocomplete
+from once_human.bot.autocomplete import specialization_autocomplete
+from once_human.bot.checks import is_user
+from once_human.bot.cogs.base import BaseCog
+from once_human.bot.ui.views.spec_holders import SpecHoldersView
+from once_human.bot.utils import response
+
+COVERAGE_BUDGET = 2.0
+
+
+class RosterCog(BaseCog, name="roster"):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @app_commands.command(description="Find who on a server has a specialization")
+    @app_commands.describe(server="Server name", specialization="Specialization name")
+    @app_commands.autocomplete(server=server_autocomplete, specialization=specialization_autocomplete)
+    @is_user()
+    async def who(self, interaction: discord.Interaction, server: str, specialization: str):
+        await response(interaction).defer(ephemeral=True)
+        async with database.AsyncSessionFactory() as session:
+            db_server = await repository.server_by_name(session, server)
+            if db_server is None:
+                await interaction.followup.send(f"Unknown server **{server}**", ephemeral=True)
+                return
+            db_spec = await repository.specialization_by_name(session, specialization)
+            if db_spec is None:
+                await interaction.followup.send(f"Unknown specialization **{specialization}**", ephemeral=True)
+                return
+            view = await SpecHoldersView.create(interaction, session, server=db_server, specialization=db_spec)
+            await view.refresh()
+            await view.wait()
+
+    @app_commands.command(description="Suggest spec changes so a server covers every scenario specialization")
+    @app_commands.describe(server="Server name")
+    @app_commands.autocomplete(server=server_autocomplete)
+    @is_user()
+    async def coverage(self, interaction: discord.Interaction, server: str):
+        await response(interaction).defer(ephemeral=True)
+        async with database.AsyncSessionFactory() as session:
+            db_server = await repository.server_by_name(session, server)
+            if db_server is None:
+                await interaction.followup.send(f"Unknown server **{server}**", ephemeral=True)
+                return
+            specs_by_level = await repository.specs_by_level(session, db_server.scenario_id)
+            builds = await repository.server_builds(session, interaction.guild_id, db_server.id)
+
+        spec_levels: dict[int, list[int]] = {}
+        spec_names: dict[int, str] = {}
+        for level, specs in specs_by_level.items():
+            for spec in specs:
+                spec_levels.setdefault(spec.id, []).append(level)
+                spec_names[spec.id] = spec.name
+        problem = optimizer.CoverageProblem(
+            spec_masks={spec_id: optimizer.level_mask(levels) for spec_id, levels in spec_levels.items()},
+            builds={player_id: build for player_id, (_, build) in builds.items()},
+        )
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self.bot.process_pool, optimizer.suggest_coverage, problem, COVERAGE_BUDGET)
+
+        lines: list[str] = []
+        for assignment in sorted(result.assignments, key=lambda a: (builds[a.player_id][0].lower(), a.level)):
+            old_spec_id = assignment.old_spec_id
+            old_name = "empty" if old_spec_id is None else spec_names.get(old_spec_id, "unavailable spec")
+            lines.append(
+                f"* **{builds[assignment.player_id][0]}** level {assignment.level}: "
+                f"{old_name} → {spec_names[assignment.new_spec_id]}"
+            )
+        if result.uncovered:
+            lines.append(f"Cannot cover: {', '.join(spec_names[spec_id] for spec_id in result.uncovered)}")
+        if not lines:
+            lines.append("Every specialization is already covered")
+        description = "\n".join(lines)
+        if len(description) > 4096:
+            description = description[:4093] + "..."
+        embed = discord.Embed(title=f"Coverage for {db_server.name}", description=description)
+        if not result.complete:
+            embed.set_footer(text="Partial result, time budget exceeded")
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(RosterCog(bot))
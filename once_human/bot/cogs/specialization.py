@@ -1,12 +1,31 @@
+from typing import Optional
+
 import discord
 from discord import app_commands
 from discord.ext import commands
 
 from once_human import database
+from once_human import repository
+from once_human import search
+from once_human import tracing
+from once_human.bot.announcements import announce
+from once_human.bot.announcements import player_change
+from once_human.bot.autocomplete import scenario_autocomplete
 from once_human.bot.checks import is_user
 from once_human.bot.cogs.base import BaseCog
+from once_human.bot.recorder import recorder
+from once_human.bot.ui.modal import PromptModal
 from once_human.bot.ui.views.user import UserView
 from once_human.bot.utils import response
+from once_human.build_code import decode_build
+from once_human.build_code import is_build_code
+from once_human.build_code import parse_build_text
+from once_human.build_code import validate_build
+from once_human.catalog import catalog
+from once_human.locks import edit_locks
+from once_human.locks import LockTimeout
+from once_human.name_index import catalog_names
+from once_human.recommendation import recommender
 
 
 class SpecializationCog(BaseCog, name="specialization"):
@@ -16,12 +35,107 @@ class SpecializationCog(BaseCog, name="specialization"):
     @app_commands.command(description="Add/Modify your in-game specializations")
     @is_user()
     async def spec(self, interaction: discord.Interaction):
+        if recorder:
+            recorder.begin(interaction, "spec")
         await response(interaction).defer(ephemeral=True)
-        async with database.AsyncSessionFactory() as session:
-            view = await UserView.create(interaction, session, discord_user=interaction.user)
-            await view.refresh()
+        async with database.AsyncSessionFactory(info={"writer": interaction.user.id}) as session:
+            with tracing.span("command", root=True, command="spec"):
+                view = await UserView.create(interaction, session, discord_user=interaction.user)
+                await view.refresh()
             await view.wait()
 
+    @app_commands.command(description="Search specialization descriptions")
+    @app_commands.describe(
+        query="Words to look for, e.g. burn damage", scenario="Only this scenario", level="Only this level"
+    )
+    @app_commands.autocomplete(scenario=scenario_autocomplete)
+    @is_user()
+    async def search(
+        self,
+        interaction: discord.Interaction,
+        query: str,
+        scenario: Optional[str] = None,
+        level: Optional[app_commands.Range[int, 5, 50]] = None,
+    ):
+        await response(interaction).defer(ephemeral=True)
+        async with database.AsyncSessionFactory() as session:
+            scenario_id = None
+            if scenario:
+                db_scenario = await repository.scenario_by_name(session, scenario)
+                if db_scenario is None:
+                    await interaction.followup.send(f"Unknown scenario **{scenario}**", ephemeral=True)
+                    return
+                scenario_id = db_scenario.id
+            results = await search.search_specializations(session, query, scenario_id=scenario_id, level=level)
+        lines = [f"* **{result.name}** ({result.category}) - {result.headline}" for result in results]
+        description = "\n".join(lines) or "No specialization matches"
+        if len(description) > 4096:
+            description = description[:4093] + "..."
+        embed = discord.Embed(title=f"Search: {query}"[:256], description=description)
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="import", description="Set a whole build from a build code or a list of spec names")
+    @app_commands.describe(player="Your player name", code="Build code, leave empty to paste spec names instead")
+    @is_user()
+    async def import_build(self, interaction: discord.Interaction, player: str, code: Optional[str] = None):
+        if code is None:
+            text_input = discord.ui.TextInput(
+                label="Build",
+                style=discord.TextStyle.paragraph,
+                placeholder="Level 5 - Spec name\nLevel 10 - Spec name\n...",
+                max_length=2000,
+                required=True,
+            )
+            modal = PromptModal(title="Import build", text_inputs=[text_input])
+            interaction = await modal.prompt(interaction)
+            if interaction is None:
+                return
+            code = text_input.value
+        await response(interaction).defer(ephemeral=True)
+        snapshot = await catalog.get(database.AsyncSessionFactory)
+        build: Optional[dict[int, int]] = None
+        if is_build_code(code):
+            try:
+                build = decode_build(code)
+            except ValueError as e:
+                await interaction.followup.send(str(e), ephemeral=True)
+                return
+
+        # read the current build from the primary too, the recommender delta must match what gets replaced
+        async with database.AsyncSessionFactory(info={"writer": interaction.user.id, "primary": True}) as session:
+            db_player = await repository.user_player_by_name(session, interaction.guild_id, interaction.user.id, player)
+            if db_player is None or db_player.server is None:
+                await interaction.followup.send(f"You have no player **{player}** with a server", ephemeral=True)
+                return
+            scenario_id = db_player.server.scenario_id
+            errors: list[str] = []
+            if build is None:
+                # names are matched within the player's scenario, a closer name elsewhere would only fail validation
+                build, errors = parse_build_text(code, catalog_names.scenario_specializations(scenario_id))
+            errors.extend(validate_build(build, snapshot, scenario_id))
+            if errors:
+                await interaction.followup.send("\n".join(errors)[:2000], ephemeral=True)
+                return
+            try:
+                async with edit_locks.saving(session, player_ids=[db_player.id]):
+                    # anything read before the lock may predate a save that just finished
+                    await session.refresh(db_player, ["version"])
+                    saved_build = await repository.player_builds(session, [db_player.id])
+                    await repository.save_player_build(session, db_player, build)
+                    await session.commit()
+            except LockTimeout:
+                await interaction.followup.send(
+                    "Another save for this player is still running, try again", ephemeral=True
+                )
+                return
+        recommender.update(scenario_id, set(saved_build[db_player.id].values()), set(build.values()))
+        announce(player_change(db_player, saved_build[db_player.id], build))
+
+        spec_names = {spec_id: snapshot.specializations[spec_id].name for spec_id in build.values()}
+        lines = [f"* **Level {level}** - {spec_names[spec_id]}" for level, spec_id in sorted(build.items())]
+        embed = discord.Embed(title=f"Imported build for {db_player.name}", description="\n".join(lines) or "Empty")
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(SpecializationCog(bot))
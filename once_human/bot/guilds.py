@@ -0,0 +1,50 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from once_human import repository
+from once_human.config import config
+from once_human.models import Guild
+
+
+@dataclass(frozen=True)
+class GuildSettings:
+    guild_id: int
+    announcement_channel: Optional[int] = config.discord.announcement_channel
+    user_role: Optional[int] = config.discord.user_role
+    admin_role: Optional[int] = config.discord.admin_role
+
+    @classmethod
+    def from_model(cls, guild: Guild) -> "GuildSettings":
+        defaults = cls(guild.id)
+        return cls(
+            guild_id=guild.id,
+            announcement_channel=guild.announcement_channel or defaults.announcement_channel,
+            user_role=guild.user_role or defaults.user_role,
+            admin_role=guild.admin_role or defaults.admin_role,
+        )
+
+
+class GuildSettingsCache:
+    def __init__(self) -> None:
+        self._settings: dict[int, GuildSettings] = {}
+
+    def get(self, guild_id: int) -> GuildSettings:
+        settings = self._settings.get(guild_id, None)
+        if settings is None:
+            settings = GuildSettings(guild_id)
+        return settings
+
+    def update(self, guild: Guild) -> None:
+        self._settings[guild.id] = GuildSettings.from_model(guild)
+
+    async def load(self, session_factory: async_sessionmaker, guild_ids: list[int]) -> None:
+        async with session_factory() as session:
+            await repository.ensure_guilds(session, guild_ids)
+            await session.commit()
+            for guild in await repository.guilds(session):
+                self.update(guild)
+
+
+guild_settings = GuildSettingsCache()
@@ -0,0 +1,116 @@
+import asyncio
+from functools import partial
+from itertools import groupby
+from operator import itemgetter
+
+import discord
+from discord.ext import commands
+from sqlalchemy import text
+
+from once_human import database
+from once_human import optimizer
+from once_human import repository
+from once_human.bot.announcements import announcer
+from once_human.bot.guilds import guild_settings
+from once_human.catalog import catalog
+from once_human.config import config
+from once_human.recommendation import Recommender
+from once_human.recommendation import recommender
+from once_human.scheduler import JobScheduler
+
+DESCRIPTION_MAX = 4096
+
+
+async def coverage_digest(bot: commands.Bot, scheduler: JobScheduler) -> None:
+    if announcer is None:
+        return
+    snapshot = await catalog.get(database.AsyncSessionFactory)
+    budget = config.scheduler.coverage_budget
+    for guild in bot.guilds:
+        channel_id = guild_settings.get(guild.id).announcement_channel
+        if channel_id is None:
+            continue
+        servers = sorted(snapshot.servers.values(), key=lambda server: server.name.lower())
+        # read every server in one session and let the connection go before the optimizer runs
+        async with database.AsyncSessionFactory() as session:
+            server_builds = [await repository.server_builds(session, guild.id, server.id) for server in servers]
+        lines: list[str] = []
+        for server, builds in zip(servers, server_builds):
+            if not builds:
+                continue
+            scenario = snapshot.scenarios[server.scenario_id]
+            spec_masks = {
+                spec_id: optimizer.level_mask(list(snapshot.specializations[spec_id].levels))
+                for spec_id in scenario.specialization_ids
+            }
+            held = {(level, spec_id) for _, build in builds.values() for level, spec_id in build.items()}
+            missing = [
+                spec_id
+                for spec_id in scenario.specialization_ids
+                if not any((level, spec_id) in held for level in snapshot.specializations[spec_id].levels)
+            ]
+            if not missing:
+                continue
+            problem = optimizer.CoverageProblem(
+                spec_masks=spec_masks, builds={player_id: build for player_id, (_, build) in builds.items()}
+            )
+            result = await scheduler.run_in_executor(optimizer.suggest_coverage, problem, budget)
+            names = ", ".join(snapshot.specializations[spec_id].name for spec_id in missing)
+            fixable = len(missing) - len(result.uncovered)
+            lines.append(f"* **{server.name}** has nobody with {names} ({fixable} fixable, see /coverage)")
+        if not lines:
+            continue
+        description = "\n".join(lines)
+        if len(description) > DESCRIPTION_MAX:
+            description = description[: DESCRIPTION_MAX - 3] + "..."
+        announcer.post(channel_id, discord.Embed(title="Coverage digest", description=description))
+
+
+async def reconcile_recommender(scheduler: JobScheduler) -> None:
+    # incremental updates drift when a save fails after the counters moved, rebuild them from the table
+    for scenario_id in recommender.scenario_ids:
+        version = recommender.version(scenario_id)
+        async with database.AsyncSessionFactory() as session:
+            rows = await repository.scenario_build_rows(session, scenario_id)
+        builds = [{spec_id for _, spec_id in group} for _, group in groupby(rows, key=itemgetter(0))]
+        matrix, popularity = await scheduler.run_in_executor(Recommender.build_matrix, builds)
+        # a save landed while rebuilding, its delta is not in the rows read above so try again next run
+        if recommender.version(scenario_id) == version:
+            recommender.replace(scenario_id, matrix, popularity)
+
+
+async def cleanup() -> None:
+    async with database.AsyncSessionFactory(info={"primary": True}) as session:
+        await repository.prune_job_runs(session, config.scheduler.job_run_retention_days)
+        await session.commit()
+
+
+async def archive_players() -> None:
+    settings = config.archive
+    archived = 0
+    # small chunks each in their own transaction, with pauses so roster queries and saves keep their latency
+    for _ in range(settings.max_chunks):
+        async with database.AsyncSessionFactory(info={"primary": True}) as session:
+            moved = await repository.archive_players(
+                session, inactive_days=settings.inactive_days, limit=settings.chunk_size
+            )
+            await session.commit()
+        archived += moved
+        if moved < settings.chunk_size:
+            break
+        await asyncio.sleep(settings.pause)
+    if archived:
+        async with database.engine.connect() as conn:
+            await conn.execute(text("ANALYZE player, player_specialization"))
+            await conn.commit()
+
+
+def register(bot: commands.Bot, scheduler: JobScheduler) -> None:
+    settings = config.scheduler
+    scheduler.add("coverage_digest", settings.coverage_digest_interval, partial(coverage_digest, bot, scheduler))
+    scheduler.add(
+        "reconcile_recommender", settings.reconcile_interval, partial(reconcile_recommender, scheduler), exclusive=False
+    )
+    scheduler.add("cleanup", settings.cleanup_interval, cleanup)
+    if config.archive.enabled:
+        scheduler.add("archive_players", config.archive.interval, archive_players)
@@ -1,10 +1,30 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
 import discord
 from discord import app_commands
 from discord import Interaction
 from discord.ext import commands
 
+from once_human import database
+from once_human import metrics
+from once_human import repository
+from once_human.api.server import ApiServer
+from once_human.bot import jobs
+from once_human.bot import ratelimit
+from once_human.bot.announcements import announcer
+from once_human.bot.guilds import guild_settings
+from once_human.bot.members import MemberSync
+from once_human.bot.recorder import recorder
 from once_human.bot.utils import response
+from once_human.build_card import build_cards
+from once_human.catalog import catalog
 from once_human.config import config
+from once_human.scheduler import JobScheduler
+from once_human.tracing import tracer
+from once_human.watchdog import LoopWatchdog
 
 
 class OnceHumanBotTree(app_commands.CommandTree):
@@ -20,23 +40,126 @@ class OnceHumanBot(commands.Bot):
     def __init__(self, ask: bool = False) -> None:
         intents = discord.Intents.default()
         intents.message_content = True
+        intents.members = config.member_sync.enabled
         super().__init__(command_prefix="", intents=intents)
-        self.guild_id = discord.Object(id=config.discord.guild)
+        self.guild_id = discord.Object(id=config.discord.guild) if config.discord.guild else None
         self.ask = ask
+        # workers start lazily, after threads, servers and database connections exist, so they must not be forked
+        self.process_pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("forkserver"))
+        self.api_server = ApiServer() if config.api.enabled else None
+        if build_cards:
+            build_cards.executor = self.process_pool
+        self.replica_monitor: Optional[asyncio.Task] = None
+        self.metrics_server = metrics.MetricsServer() if config.metrics.enabled else None
+        self.lag_probe = metrics.LoopLagProbe(config.metrics.lag_interval)
+        self.lag_probe_task: Optional[asyncio.Task] = None
+        self.watchdog: Optional[LoopWatchdog] = None
+        if config.watchdog.enabled:
+            self.watchdog = LoopWatchdog(
+                self.lag_probe,
+                threshold=config.watchdog.threshold,
+                max_findings=config.watchdog.max_findings,
+                stack_limit=config.watchdog.stack_limit,
+            )
+        self.scheduler: Optional[JobScheduler] = None
+        if config.scheduler.enabled:
+            self.scheduler = JobScheduler(
+                database.AsyncSessionFactory, jitter=config.scheduler.jitter, executor=self.process_pool
+            )
+            jobs.register(self, self.scheduler)
+        self.member_sync: Optional[MemberSync] = None
+        if config.member_sync.enabled:
+            self.member_sync = MemberSync(
+                database.AsyncSessionFactory,
+                window=config.member_sync.window,
+                batch_size=config.member_sync.batch_size,
+            )
 
     async def on_ready(self) -> None:
+        guild_ids = [guild.id for guild in self.guilds]
+        await database.ensure_guild_partitions(guild_ids)
+        await guild_settings.load(database.AsyncSessionFactory, guild_ids)
+        if self.member_sync:
+            for guild in self.guilds:
+                self.member_sync.schedule_guild(guild)
         print(f"Logged in as {self.user} (ID: {self.user.id})")
         print("------")
 
+    async def on_guild_join(self, guild: discord.Guild) -> None:
+        await database.ensure_guild_partitions([guild.id])
+        await guild_settings.load(database.AsyncSessionFactory, [guild.id])
+        if self.member_sync:
+            self.member_sync.schedule_guild(guild)
+
+    async def on_member_join(self, member: discord.Member) -> None:
+        if self.member_sync:
+            self.member_sync.queue(member)
+
+    async def on_member_update(self, before: discord.Member, after: discord.Member) -> None:
+        if self.member_sync and before.display_name != after.display_name:
+            self.member_sync.queue(after)
+
+    async def on_user_update(self, before: discord.User, after: discord.User) -> None:
+        if self.member_sync and (before.name, before.display_name) != (after.name, after.display_name):
+            # keep the guild nickname when there is one, like the rest of the bot shows
+            member = next((m for guild in self.guilds if (m := guild.get_member(after.id))), after)
+            self.member_sync.queue(member)
+
     async def setup_hook(self) -> None:
-        for ext in ["admin", "specialization"]:
+        for ext in ["admin", "roster", "specialization"]:
             await self.load_extension(f"cogs.{ext}")
+        async with database.AsyncSessionFactory(info={"primary": True}) as session:
+            await repository.sync_specialization_levels(session)
+            await session.commit()
+        await catalog.get(database.AsyncSessionFactory)
+        ratelimit.install()
 
-        self.tree.copy_global_to(guild=self.guild_id)
+        if self.guild_id:
+            self.tree.copy_global_to(guild=self.guild_id)
         if self.ask and input("sync?") == "y":
             await self.tree.sync(guild=self.guild_id)
             print("synced")
 
+        if database.replicas.engines:
+            self.replica_monitor = asyncio.create_task(database.replicas.monitor(config.db.replica_check_interval))
+        if self.api_server:
+            await self.api_server.start()
+        if announcer:
+            announcer.start(self, database.AsyncSessionFactory)
+        if self.scheduler:
+            self.scheduler.start()
+        self.lag_probe_task = asyncio.create_task(self.lag_probe.run())
+        if self.watchdog:
+            self.watchdog.start()
+        if self.metrics_server:
+            await self.metrics_server.start()
+
+    async def close(self) -> None:
+        if self.replica_monitor:
+            self.replica_monitor.cancel()
+        if self.lag_probe_task:
+            self.lag_probe_task.cancel()
+        if self.watchdog:
+            self.watchdog.stop()
+        if self.member_sync:
+            await self.member_sync.close()
+        if self.scheduler:
+            self.scheduler.stop()
+        if announcer:
+            announcer.stop()
+        if build_cards:
+            await build_cards.icons.close()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        if recorder:
+            recorder.flush()
+        if tracer:
+            tracer.flush()
+        if self.api_server:
+            await self.api_server.stop()
+        self.process_pool.shutdown(wait=False, cancel_futures=True)
+        await super().close()
+
 
 if __name__ == "__main__":
     bot = OnceHumanBot()
@@ -0,0 +1,66 @@
+import asyncio
+from itertools import batched
+from typing import Optional
+
+import discord
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from once_human import metrics
+from once_human import repository
+
+users_synced = metrics.Counter("once_human_users_synced_total", "User rows inserted or renamed by member sync")
+
+
+def user_record(member: discord.Member | discord.User) -> repository.UserRecord:
+    return member.id, member.name, member.display_name
+
+
+class MemberSync:
+    def __init__(self, session_factory: async_sessionmaker, *, window: float = 2, batch_size: int = 5000) -> None:
+        self.session_factory = session_factory
+        self.window = window
+        self.batch_size = batch_size
+        self._pending: dict[int, repository.UserRecord] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._guild_tasks: dict[int, asyncio.Task] = {}
+
+    async def _write(self, records: list[repository.UserRecord]) -> None:
+        for batch in batched(records, self.batch_size):
+            async with self.session_factory(info={"primary": True}) as session:
+                changed = await repository.sync_users(session, list(batch))
+                await session.commit()
+            users_synced.inc(amount=changed)
+
+    async def sync_guild(self, guild: discord.Guild) -> None:
+        if not guild.chunked:
+            await guild.chunk()
+        await self._write([user_record(member) for member in guild.members if not member.bot])
+
+    def schedule_guild(self, guild: discord.Guild) -> None:
+        task = self._guild_tasks.get(guild.id, None)
+        if task is None or task.done():
+            self._guild_tasks[guild.id] = asyncio.create_task(self.sync_guild(guild))
+
+    def queue(self, member: discord.Member | discord.User) -> None:
+        if member.bot:
+            return
+        # later events for the same member replace earlier ones, so a burst of edits costs one row
+        self._pending[member.id] = user_record(member)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.window)
+        await self.flush()
+
+    async def flush(self) -> None:
+        records = list(self._pending.values())
+        self._pending.clear()
+        await self._write(records)
+
+    async def close(self) -> None:
+        for task in self._guild_tasks.values():
+            task.cancel()
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            await self.flush()
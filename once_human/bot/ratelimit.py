@@ -0,0 +1,36 @@
+import logging
+import time
+from typing import Optional
+
+from once_human import metrics
+
+
+class RateLimitHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__(logging.WARNING)
+        self.last_hit: Optional[float] = None
+        self.last_retry_after = 0.0
+        self.last_scope: Optional[str] = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        message = str(record.msg).lower()
+        if "rate limit" not in message:
+            return
+        scope = "global" if "global" in message else "bucket" if "bucket" in message else "route"
+        # discord.http passes the retry delay as the last float argument of these warnings
+        args = record.args if isinstance(record.args, tuple) else ()
+        retry_after = next((arg for arg in reversed(args) if isinstance(arg, float)), 0.0)
+        metrics.rate_limits.inc(scope)
+        metrics.rate_limit_retry_after.inc(scope, amount=retry_after)
+        self.last_hit = time.monotonic()
+        self.last_retry_after = retry_after
+        self.last_scope = scope
+
+
+rate_limit_handler = RateLimitHandler()
+
+
+def install() -> None:
+    logger = logging.getLogger("discord.http")
+    if rate_limit_handler not in logger.handlers:
+        logger.addHandler(rate_limit_handler)
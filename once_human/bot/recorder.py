@@ -0,0 +1,115 @@
+import hashlib
+import hmac
+import json
+import os
+import time
+from typing import Any
+from typing import Optional
+
+import discord
+
+from once_human.cache import LRUCache
+from once_human.config import config
+
+
+class InteractionRecorder:
+    def __init__(self, path: str, *, salt: str, flush_every: int = 100, max_sessions: int = 10000) -> None:
+        self.path = path
+        self.salt = salt.encode()
+        self.flush_every = flush_every
+        self._started = time.monotonic()
+        self._buffer: list[str] = []
+        # users who went quiet long ago start a new session when they come back
+        self._sessions: LRUCache[str, str] = LRUCache(max_sessions)
+        self._session_count = 0
+
+    def anonymize(self, user_id: int) -> str:
+        return hmac.new(self.salt, str(user_id).encode(), hashlib.sha256).hexdigest()[:16]
+
+    def _session(self, interaction: discord.Interaction) -> str:
+        user = self.anonymize(interaction.user.id)
+        session = self._sessions.get(user)
+        if session is None:
+            session = self._begin(user)
+        return session
+
+    def _begin(self, user: str) -> str:
+        self._session_count += 1
+        session = f"{user}:{self._session_count}"
+        self._sessions.put(user, session)
+        return session
+
+    def _record(self, event: str, session: str, *, at: Optional[float] = None, **data: Any) -> None:
+        # replays schedule on t, so events are stamped when they arrived and their handling time goes in elapsed
+        at = time.monotonic() if at is None else at
+        data = {"t": round(at - self._started, 4), "event": event, "session": session, **data}
+        self._buffer.append(json.dumps(data))
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def begin(self, interaction: discord.Interaction, command: str) -> None:
+        session = self._begin(self.anonymize(interaction.user.id))
+        self._record("command", session, command=command)
+
+    @staticmethod
+    def locate(view: discord.ui.View, interaction: discord.Interaction) -> tuple[Optional[int], list[int]]:
+        data = interaction.data or {}
+        custom_id = data.get("custom_id", None)
+        for index, item in enumerate(view.children):
+            if getattr(item, "custom_id", None) != custom_id:
+                continue
+            values = data.get("values", [])
+            option_values = [opt.value for opt in getattr(item, "options", [])]
+            return index, [option_values.index(value) for value in values if value in option_values]
+        return None, []
+
+    def callback(
+        self,
+        view: discord.ui.View,
+        name: str,
+        interaction: discord.Interaction,
+        *,
+        item: Optional[int],
+        values: list[int],
+        started: float,
+    ) -> None:
+        self._record(
+            "callback",
+            self._session(interaction),
+            view=type(view).__name__,
+            callback=name,
+            item=item,
+            values=values,
+            at=started,
+            elapsed=round(time.monotonic() - started, 4),
+        )
+
+    def response(self, view: discord.ui.View, method: str, interaction: discord.Interaction, started: float) -> None:
+        self._record(
+            "response",
+            self._session(interaction),
+            view=type(view).__name__,
+            method=method,
+            at=started,
+            elapsed=round(time.monotonic() - started, 4),
+        )
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a") as fp:
+            fp.write("\n".join(self._buffer) + "\n")
+        self._buffer.clear()
+
+
+recorder: Optional[InteractionRecorder] = None
+if config.recorder.enabled:
+    recorder = InteractionRecorder(
+        config.recorder.path,
+        salt=config.recorder.salt,
+        flush_every=config.recorder.flush_every,
+        max_sessions=config.recorder.max_sessions,
+    )
@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from dataclasses import dataclass
+from itertools import count
+from operator import itemgetter
+from typing import Any
+from typing import Optional
+
+import discord
+
+from once_human import database
+from once_human import repository
+from once_human.bot.ui.views.base import BaseView
+from once_human.bot.ui.views.user import UserView
+
+_names = count(1)
+
+
+@dataclass
+class ReplayUser:
+    id: int
+    name: str
+    display_name: str
+
+
+class ReplayResponse:
+    def __init__(self, interaction: "ReplayInteraction") -> None:
+        self.interaction = interaction
+        self._tasks: set[asyncio.Task] = set()
+
+    async def defer(self, **kwargs) -> None:
+        pass
+
+    async def send_message(self, *args, **kwargs) -> None:
+        pass
+
+    async def edit_message(self, *, view: Optional[discord.ui.View] = None, **kwargs) -> None:
+        if view is not None:
+            self.interaction.view = view
+
+    async def send_modal(self, modal: discord.ui.Modal) -> None:
+        for item in modal.children:
+            if isinstance(item, discord.ui.TextInput):
+                item._value = f"replay-{next(_names)}"
+        task = asyncio.create_task(modal.on_submit(self.interaction))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+class ReplayInteraction:
+    def __init__(self, user: ReplayUser, guild_id: int) -> None:
+        self.user = user
+        self.guild_id = guild_id
+        self.response = ReplayResponse(self)
+        self.data: dict[str, Any] = {}
+        self.view: Optional[BaseView] = None
+
+    async def edit_original_response(self, *, view: Optional[discord.ui.View] = None, **kwargs) -> None:
+        if view is not None:
+            self.view = view
+
+
+class Replayer:
+    def __init__(self, events: list[dict[str, Any]], *, speed: float = 1, guild_id: int = 0) -> None:
+        self.speed = speed
+        self.guild_id = guild_id
+        self.sessions: dict[str, list[dict[str, Any]]] = {}
+        # events are written when they finish, t is when they arrived
+        for event in sorted(events, key=itemgetter("t")):
+            self.sessions.setdefault(event["session"], []).append(event)
+        self.origin = min((event["t"] for event in events), default=0)
+        self.latencies: dict[str, list[float]] = {}
+        self.skipped = 0
+
+    async def _wait_until(self, start: float, t: float) -> None:
+        delay = start + (t - self.origin) / self.speed - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _dispatch(self, interaction: ReplayInteraction, event: dict[str, Any]) -> None:
+        view = interaction.view
+        if view is None or view.is_finished() or type(view).__name__ != event["view"] or event["item"] is None:
+            self.skipped += 1
+            return
+        item = view.children[event["item"]]
+        interaction.data = {"custom_id": item.custom_id}
+        if isinstance(item, discord.ui.Select):
+            values = [item.options[i].value for i in event["values"] if i < len(item.options)]
+            interaction.data["values"] = values
+            item._refresh_state(interaction, interaction.data)
+        started = time.monotonic()
+        await item.callback(interaction)
+        self.latencies.setdefault(f"{event['view']}.{event['callback']}", []).append(time.monotonic() - started)
+
+    async def _replay_session(self, session_id: str, events: list[dict[str, Any]], start: float) -> None:
+        command, *events = events
+        if command["event"] != "command" or command["command"] != "spec":
+            self.skipped += len(events) + 1
+            return
+        await self._wait_until(start, command["t"])
+        user_hash = session_id.split(":")[0]
+        user = ReplayUser(id=int(user_hash, 16) >> 1, name=f"replay-{user_hash}", display_name=user_hash)
+        interaction = ReplayInteraction(user, self.guild_id)
+        async with database.AsyncSessionFactory() as session:
+            view = await UserView.create(interaction, session, discord_user=user)
+            interaction.view = view
+            await view.refresh()
+            for event in events:
+                if event["event"] != "callback":
+                    continue
+                await self._wait_until(start, event["t"])
+                await self._dispatch(interaction, event)
+            if interaction.view and not interaction.view.is_finished():
+                interaction.view.stop()
+
+    async def run(self) -> None:
+        async with database.AsyncSessionFactory() as session:
+            await repository.ensure_guilds(session, [self.guild_id])
+            await session.commit()
+        start = time.monotonic()
+        await asyncio.gather(
+            *[self._replay_session(session_id, events, start) for session_id, events in self.sessions.items()]
+        )
+
+    def summary(self) -> str:
+        lines = [f"{'callback':<45} {'count':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}"]
+        for name, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            lines.append(
+                f"{name:<45} {len(values):>6} {statistics.mean(values) * 1000:>9.2f} "
+                f"{statistics.median(values) * 1000:>9.2f} {p95 * 1000:>9.2f}"
+            )
+        lines.append(f"skipped events: {self.skipped}")
+        return "\n".join(lines)
+
+
+def load_events(path: str) -> list[dict[str, Any]]:
+    with open(path) as fp:
+        return [json.loads(line) for line in fp if line.strip()]
+
+
+async def main(path: str, speed: float, guild_id: int) -> None:
+    replayer = Replayer(load_events(path), speed=speed, guild_id=guild_id)
+    await replayer.run()
+    print(replayer.summary())
+    await database.engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded interaction traces against the configured database")
+    parser.add_argument("path")
+    parser.add_argument("--speed", type=float, default=1, help="replay speed multiplier, e.g. 4 for 4x")
+    parser.add_argument("--guild", type=int, default=0, help="guild id the replayed players belong to")
+    args = parser.parse_args()
+    asyncio.run(main(args.path, args.speed, args.guild))
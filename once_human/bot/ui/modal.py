@@ -1,3 +1,5 @@
+from typing import Optional
+
 import discord.ui
 from discord import Interaction
 
@@ -19,3 +21,20 @@ class BaseModal(discord.ui.Modal):
     async def show(self) -> None:
         await response(self.parent_view.interaction).send_modal(self)
         await self.wait()
+
+
+class PromptModal(discord.ui.Modal):
+    def __init__(self, *, title: str, text_inputs: list[discord.ui.TextInput], timeout: Optional[float] = 600):
+        super().__init__(title=title, timeout=timeout)
+        self.interaction: Optional[Interaction] = None
+        for item in text_inputs:
+            self.add_item(item)
+
+    async def on_submit(self, interaction: Interaction) -> None:
+        self.interaction = interaction
+        self.stop()
+
+    async def prompt(self, interaction: Interaction) -> Optional[Interaction]:
+        await response(interaction).send_modal(self)
+        await self.wait()
+        return self.interaction
@@ -0,0 +1,137 @@
+import abc
+import asyncio
+import functools
+from bisect import bisect_right
+from typing import Optional
+
+import discord
+
+from once_human.bot.ui.button import BaseButton
+from once_human.bot.ui.modal import BaseModal
+from once_human.bot.ui.select import DISCORD_SELECT_MAX
+from once_human.bot.ui.select import SingleSelect
+from once_human.bot.ui.select import SingleSelected
+from once_human.bot.ui.views.base import BaseView
+from once_human.bot.utils import InteractionCallback
+from once_human.models import Base
+
+type PageKey = tuple[str, int]
+
+# ids start at 1 and unsaved objects sort as 0, so -1 places a key before every row with that name
+FIRST_PAGE: PageKey = ("", -1)
+
+
+def page_key(obj: Base) -> PageKey:
+    return obj.lower_name, obj.id or 0
+
+
+class PageSource[T: Base](abc.ABC):
+    @abc.abstractmethod
+    async def fetch(self, after: PageKey, limit: int) -> list[T]:
+        pass
+
+
+class ListPageSource[T: Base](PageSource[T]):
+    def __init__(self, objects: list[T]) -> None:
+        self.objects = objects
+
+    async def fetch(self, after: PageKey, limit: int) -> list[T]:
+        start = bisect_right(self.objects, after, key=page_key)
+        return self.objects[start : start + limit]
+
+
+class Pager[T: Base]:
+    def __init__(self, source: PageSource[T], *, page_size: int = DISCORD_SELECT_MAX) -> None:
+        self.source = source
+        self.page_size = page_size
+        self.starts: list[PageKey] = [FIRST_PAGE]
+        self.objects: list[T] = []
+        self.has_next = False
+        self._selected: Optional[str] = None
+        self._prefetch: Optional[tuple[PageKey, asyncio.Task[list[T]]]] = None
+
+        self.select: Optional[SingleSelect[T]] = None
+        self.prev_button: Optional[BaseButton] = None
+        self.next_button: Optional[BaseButton] = None
+        self.jump_button: Optional[BaseButton] = None
+
+    def build_ui(self, select: SingleSelect[T], callback: InteractionCallback) -> list[BaseButton]:
+        self.select = select
+        self.prev_button = BaseButton(emoji="⏪", callback=callback)
+        self.next_button = BaseButton(emoji="⏩", callback=callback)
+        self.jump_button = BaseButton(label="Jump to...", callback=callback)
+        buttons = [self.prev_button, self.next_button, self.jump_button]
+        for button in buttons:
+            button.callback = functools.partial(callback, button)
+        self._refresh_select()
+        return buttons
+
+    @property
+    def selected(self) -> Optional[str]:
+        return self._selected
+
+    @selected.setter
+    def selected(self, selected: Optional[SingleSelected[T]]) -> None:
+        if isinstance(selected, Base):
+            selected = self.select.option_value(selected)
+        self._selected = selected
+        self.select.selected = selected
+
+    def _refresh_select(self) -> None:
+        if self.select:
+            self.select.refresh(self.objects, selected=self._selected)
+
+    def _cancel_prefetch(self) -> None:
+        if self._prefetch:
+            self._prefetch[1].cancel()
+            self._prefetch = None
+
+    async def _load(self, start: PageKey) -> None:
+        if self._prefetch and self._prefetch[0] == start:
+            objects = await self._prefetch[1]
+            self._prefetch = None
+        else:
+            self._cancel_prefetch()
+            objects = await self.source.fetch(start, self.page_size + 1)
+        self.has_next = len(objects) > self.page_size
+        self.objects = objects[: self.page_size]
+        self._refresh_select()
+        if self.has_next:
+            next_start = page_key(self.objects[-1])
+            self._prefetch = (next_start, asyncio.create_task(self.source.fetch(next_start, self.page_size + 1)))
+
+    async def open(self) -> None:
+        self.starts = [FIRST_PAGE]
+        await self._load(FIRST_PAGE)
+
+    async def show(self, selected: Optional[T] = None) -> None:
+        self._cancel_prefetch()
+        if selected is not None:
+            self.selected = selected
+        await self._load(self.starts[-1])
+        if selected is not None and not self.select.has_selected:
+            name, obj_id = page_key(selected)
+            self.starts.append((name, obj_id - 1))
+            await self._load(self.starts[-1])
+        elif not self.objects and len(self.starts) > 1:
+            self.starts.pop()
+            await self._load(self.starts[-1])
+
+    async def turn(self, view: BaseView, button: BaseButton) -> None:
+        if button is self.prev_button:
+            self.starts.pop()
+        elif button is self.next_button:
+            self.starts.append(page_key(self.objects[-1]))
+        else:
+            prefix_input = discord.ui.TextInput(
+                label="Name starts with", style=discord.TextStyle.short, min_length=1, max_length=100, required=True
+            )
+            await BaseModal(view, title="Jump to", text_inputs=[prefix_input]).show()
+            self.starts.append((prefix_input.value.lower(), -1))
+        await self._load(self.starts[-1])
+
+    def update_view(self) -> None:
+        self.select.show()
+        self.prev_button.disabled = len(self.starts) == 1
+        self.next_button.disabled = not self.has_next
+        self.jump_button.disabled = len(self.starts) == 1 and not self.has_next
@@ -2,15 +2,21 @@ import abc
 import asyncio
 import functools
 import inspect
+import time
 from abc import abstractmethod
+from collections import Counter
 from typing import Awaitable
 from typing import Callable
 from typing import Optional
 from typing import Self
+from weakref import WeakSet
 
 import discord
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from once_human import metrics
+from once_human import tracing
+from once_human.bot.recorder import recorder
 from once_human.bot.ui.embed import Error
 from once_human.bot.ui.embed import TimedEmbed
 from once_human.bot.utils import InteractionCallback
@@ -19,6 +25,20 @@ from once_human.bot.utils import response
 type Layout = list[list[discord.ui.Item]]
 type DecoratedCallback[**P] = Callable[[P], Awaitable[None]]
 
+STALE_MESSAGE = "This player was changed somewhere else while you were editing, open it again to see the changes"
+
+live_views: WeakSet["BaseView"] = WeakSet()
+
+
+def _live_view_counts() -> dict[metrics.LabelValues, float]:
+    counts = Counter(type(view).__name__ for view in live_views if not view.is_finished())
+    return {(name,): count for name, count in counts.items()}
+
+
+live_views_gauge = metrics.Gauge(
+    "once_human_live_views", "Views that have not finished", ("view",), collect=_live_view_counts
+)
+
 
 def intercept_interaction(orig_func: DecoratedCallback) -> InteractionCallback:
     is_inner_func = len(inspect.signature(orig_func).parameters) == 0
@@ -30,13 +50,22 @@ def intercept_interaction(orig_func: DecoratedCallback) -> InteractionCallback:
             func = functools.partial(func, args[0])
             args = args[1:]
         view: BaseView = args[0]
+        view_name = type(view).__name__
         interaction = args[-1]
         view.interaction = interaction
-        if is_inner_func:
-            result = await func()
-        else:
-            args = args[:-1]
-            result = await func(*args)
+        if recorder:
+            item, values = recorder.locate(view, interaction)
+        started = view.last_active = time.monotonic()
+        with tracing.span("interaction", root=True, view=view_name, callback=orig_func.__name__):
+            if is_inner_func:
+                result = await func()
+            else:
+                args = args[:-1]
+                result = await func(*args)
+        metrics.interactions.inc(view_name, orig_func.__name__)
+        metrics.interaction_seconds.observe(view_name, orig_func.__name__, value=time.monotonic() - started)
+        if recorder:
+            recorder.callback(view, orig_func.__name__, interaction, item=item, values=values, started=started)
         return result
 
     return set_interaction
@@ -47,6 +76,9 @@ class BaseView(discord.ui.View, abc.ABC):
         super().__init__(**kwargs)
         self.interaction = interaction
         self.session = session
+        self.created_at = time.monotonic()
+        self.last_active = self.created_at
+        live_views.add(self)
         self._static_embeds: list[discord.Embed] = []
         self._timed_embeds: list[discord.Embed] = []
 
@@ -58,10 +90,14 @@ class BaseView(discord.ui.View, abc.ABC):
     async def create(
         cls, interaction: discord.Interaction, session: AsyncSession, *, timeout: Optional[float] = None, **kwargs
     ) -> Self:
-        view = cls(interaction, session, timeout=timeout, **kwargs)
-        await view.load_database_objects()
-        view.build_ui()
-        view.update_view()
+        with tracing.span("create", root=True, view=cls.__name__):
+            view = cls(interaction, session, timeout=timeout, **kwargs)
+            with tracing.span("load_database_objects", view=cls.__name__):
+                await view.load_database_objects()
+            with tracing.span("build_ui", view=cls.__name__):
+                view.build_ui()
+            with tracing.span("update_view", view=cls.__name__):
+                view.update_view()
         return view
 
     async def load_database_objects(self) -> None:
@@ -98,6 +134,7 @@ class BaseView(discord.ui.View, abc.ABC):
         view: Optional[discord.ui.View] = None,
         content: Optional[str] = None,
         embeds: Optional[list[discord.Embed | TimedEmbed]] = None,
+        attachments: Optional[list[discord.File]] = None,
     ) -> None:
         if self.is_finished():
             return
@@ -118,7 +155,16 @@ class BaseView(discord.ui.View, abc.ABC):
                     self._timed_embeds.append(embed.embed)
             if static_embeds:
                 self._static_embeds = static_embeds
-        await response(self.interaction).edit_message(content=content, embeds=self._embeds, view=view or self)
+        started = time.monotonic()
+        with tracing.span("edit_message", view=type(self).__name__):
+            await response(self.interaction).edit_message(
+                content=content,
+                embeds=self._embeds,
+                view=view or self,
+                attachments=discord.utils.MISSING if attachments is None else attachments,
+            )
+        if recorder:
+            recorder.response(self, "edit_message", self.interaction, started)
         tasks: list[Awaitable[None]] = [
             self._send_timed_embeds(embeds, duration) for duration, embeds in timed_embeds.items()
         ]
@@ -127,11 +173,19 @@ class BaseView(discord.ui.View, abc.ABC):
     async def refresh(self, content: Optional[str] = None) -> None:
         if self.is_finished():
             return
-        await self.interaction.edit_original_response(content=content, embeds=self._embeds, view=self)
+        started = time.monotonic()
+        with tracing.span("edit_original_response", view=type(self).__name__):
+            await self.interaction.edit_original_response(content=content, embeds=self._embeds, view=self)
+        if recorder:
+            recorder.response(self, "edit_original_response", self.interaction, started)
 
     async def send_error(self, description: str, duration: float = 5) -> None:
         await self.interact(embeds=[TimedEmbed(Error(description), duration)])
 
+    async def finish_stale(self) -> None:
+        await self.session.rollback()
+        await self.finish(content=STALE_MESSAGE, delete_after=None)
+
     async def finish(
         self,
         *,
@@ -144,7 +198,8 @@ class BaseView(discord.ui.View, abc.ABC):
         self.clear_items()
         self._static_embeds = []
         self._timed_embeds = []
-        await response(self.interaction).edit_message(
-            content=content, embeds=embeds or [], view=self, delete_after=delete_after
-        )
+        with tracing.span("edit_message", view=type(self).__name__):
+            await response(self.interaction).edit_message(
+                content=content, embeds=embeds or [], attachments=[], view=self, delete_after=delete_after
+            )
         self.stop()
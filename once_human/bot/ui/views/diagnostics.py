@@ -0,0 +1,189 @@
+import time
+from collections import Counter
+from typing import Optional
+
+import discord
+from discord.ext import commands
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from once_human import database
+from once_human import metrics
+from once_human import tracing
+from once_human.bot.ratelimit import rate_limit_handler
+from once_human.bot.ui.button import BaseButton
+from once_human.bot.ui.views.base import BaseView
+from once_human.bot.ui.views.base import intercept_interaction
+from once_human.bot.ui.views.base import Layout
+from once_human.bot.ui.views.base import live_views
+from once_human.cache import caches
+from once_human.catalog import catalog
+
+IDLE_VIEW_SECONDS = 600
+FIELD_MAX = 1024
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def _field(lines: list[str]) -> str:
+    value = "\n".join(lines) or "-"
+    return value if len(value) <= FIELD_MAX else value[: FIELD_MAX - 3] + "..."
+
+
+class DiagnosticsView(BaseView):
+    def __init__(self, interaction: discord.Interaction, session: AsyncSession, *, bot: commands.Bot, **kwargs) -> None:
+        super().__init__(interaction, session, **kwargs)
+        self.bot = bot
+
+        self.refresh_button: Optional[BaseButton] = None
+        self.invalidate_button: Optional[BaseButton] = None
+        self.evict_button: Optional[BaseButton] = None
+        self.sql_button: Optional[BaseButton] = None
+        self.close_button: Optional[BaseButton] = None
+
+    @property
+    def sql_enabled(self) -> bool:
+        return metrics.query_timer.enabled
+
+    def build_ui(self) -> None:
+        self.refresh_button = BaseButton(
+            label="Refresh", style=discord.ButtonStyle.primary, callback=self.refresh_stats
+        )
+        self.invalidate_button = BaseButton(
+            label="Invalidate caches", style=discord.ButtonStyle.secondary, callback=self.invalidate_caches
+        )
+        self.evict_button = BaseButton(
+            label="Evict idle views", style=discord.ButtonStyle.secondary, callback=self.evict_idle_views
+        )
+        self.sql_button = BaseButton(style=discord.ButtonStyle.secondary, callback=self.toggle_sql)
+        self.close_button = BaseButton(label="Close", style=discord.ButtonStyle.danger, callback=self.close)
+        layout: Layout = [
+            [self.refresh_button, self.invalidate_button, self.evict_button, self.sql_button, self.close_button]
+        ]
+        self.add_layout(layout)
+        self._static_embeds = [self._create_embed()]
+
+    def _view_lines(self, now: float) -> list[str]:
+        ages: dict[str, list[float]] = {}
+        for view in list(live_views):
+            if not view.is_finished() and view is not self:
+                ages.setdefault(type(view).__name__, []).append(now - view.created_at)
+        return [
+            f"{name}: {len(values)} open, oldest {max(values):.0f}s"
+            for name, values in sorted(ages.items(), key=lambda item: -len(item[1]))
+        ]
+
+    @staticmethod
+    def _pool_lines() -> list[str]:
+        stats: dict[str, dict[str, float]] = {}
+        for (engine_name, state), value in database.pool_stats().items():
+            stats.setdefault(engine_name, {})[state] = value
+        lines = [
+            f"{name}: {states['checked_out']:.0f} out, {states['idle']:.0f} idle, {states['overflow']:.0f} overflow"
+            for name, states in stats.items()
+        ]
+        waits = metrics.pool_wait_seconds
+        for label_values, counts in waits.counts.items():
+            total = sum(counts)
+            lines.append(f"checkouts: {total}, mean wait {waits.sums[label_values] / total * 1000:.1f}ms")
+        return lines
+
+    @staticmethod
+    def _cache_lines() -> list[str]:
+        lines = [
+            f"{name}: {len(cache)}/{cache.maxsize}, hit ratio {cache.hit_ratio:.0%}"
+            for name, cache in sorted(caches.items())
+        ]
+        if catalog.snapshot:
+            lines.append(f"catalog: version {catalog.snapshot.version}{' (stale)' if catalog.stale else ''}")
+        return lines
+
+    @staticmethod
+    def _query_lines(now: float) -> list[str]:
+        return [
+            f"{query.seconds * 1000:.0f}ms, {now - query.at:.0f}s ago: `{query.statement[:80]}`"
+            for query in reversed(metrics.query_timer.slow)
+        ][:5]
+
+    def _lag_lines(self) -> list[str]:
+        probe: Optional[metrics.LoopLagProbe] = getattr(self.bot, "lag_probe", None)
+        if probe is None:
+            return []
+        lags = sorted(probe.recent)
+        lines = [
+            f"p50 {_percentile(lags, 0.5) * 1000:.1f}ms, p95 {_percentile(lags, 0.95) * 1000:.1f}ms, "
+            f"p99 {_percentile(lags, 0.99) * 1000:.1f}ms, max {(lags[-1] if lags else 0) * 1000:.1f}ms"
+        ]
+        watchdog = getattr(self.bot, "watchdog", None)
+        if watchdog and watchdog.findings:
+            stalls = Counter(f"{stall.view}.{stall.callback}" for stall in watchdog.findings)
+            lines.extend(f"stall {name}: {count}x" for name, count in stalls.most_common(3))
+        return lines
+
+    @staticmethod
+    def _rate_limit_lines(now: float) -> list[str]:
+        totals = metrics.rate_limits.values
+        lines = [f"{scope}: {count:.0f} hits" for (scope,), count in totals.items()]
+        if rate_limit_handler.last_hit is not None:
+            lines.append(
+                f"last {rate_limit_handler.last_scope} hit {now - rate_limit_handler.last_hit:.0f}s ago, "
+                f"retry after {rate_limit_handler.last_retry_after:.2f}s"
+            )
+        return lines
+
+    def _create_embed(self) -> discord.Embed:
+        now = time.monotonic()
+        wall_now = time.time()
+        embed = discord.Embed(title="Diagnostics")
+        embed.add_field(name="Views", value=_field(self._view_lines(now)), inline=False)
+        embed.add_field(name="Connection pool", value=_field(self._pool_lines()), inline=False)
+        embed.add_field(name="Caches", value=_field(self._cache_lines()), inline=False)
+        embed.add_field(name="Slow queries", value=_field(self._query_lines(wall_now)), inline=False)
+        embed.add_field(name="Event loop lag", value=_field(self._lag_lines()), inline=False)
+        embed.add_field(name="Rate limits", value=_field(self._rate_limit_lines(now)), inline=False)
+        embed.set_footer(text=f"SQL instrumentation {'on' if self.sql_enabled else 'off'}")
+        return embed
+
+    async def _show(self, content: Optional[str] = None) -> None:
+        self.update_view()
+        await self.interact(content=content, embeds=[self._create_embed()])
+
+    @intercept_interaction
+    async def refresh_stats(self) -> None:
+        await self._show()
+
+    @intercept_interaction
+    async def invalidate_caches(self) -> None:
+        catalog.invalidate()
+        for cache in list(caches.values()):
+            cache.clear()
+        await self._show("Caches invalidated")
+
+    @intercept_interaction
+    async def evict_idle_views(self) -> None:
+        now = time.monotonic()
+        idle = [
+            view
+            for view in list(live_views)
+            if view is not self and not view.is_finished() and now - view.last_active > IDLE_VIEW_SECONDS
+        ]
+        for view in idle:
+            view.stop()
+        await self._show(f"Evicted {len(idle)} idle views")
+
+    @intercept_interaction
+    async def toggle_sql(self) -> None:
+        enabled = not self.sql_enabled
+        metrics.query_timer.enabled = enabled
+        database.engine.echo = enabled
+        if tracing.tracer:
+            tracing.tracer.sql = enabled
+        await self._show(f"SQL instrumentation {'enabled' if enabled else 'disabled'}")
+
+    @intercept_interaction
+    async def close(self) -> None:
+        await self.finish()
+
+    def update_view(self) -> None:
+        self.sql_button.label = "Disable SQL" if self.sql_enabled else "Enable SQL"
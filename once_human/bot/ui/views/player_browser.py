@@ -0,0 +1,94 @@
+from typing import Optional
+
+import discord
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from once_human import database
+from once_human import repository
+from once_human.bot.ui.button import BaseButton
+from once_human.bot.ui.pager import PageKey
+from once_human.bot.ui.pager import Pager
+from once_human.bot.ui.pager import PageSource
+from once_human.bot.ui.select import SingleSelect
+from once_human.bot.ui.views.base import BaseView
+from once_human.bot.ui.views.base import intercept_interaction
+from once_human.bot.ui.views.base import Layout
+from once_human.models import Player
+from once_human.models import Specialization
+
+
+class ServerPlayerSource(PageSource[Player]):
+    def __init__(self, player: Player) -> None:
+        self.player = player
+
+    async def fetch(self, after: PageKey, limit: int) -> list[Player]:
+        # pages are prefetched while the view's session is busy, so each fetch gets its own short-lived session
+        async with database.AsyncSessionFactory() as session:
+            return await repository.other_server_players(session, self.player, after=after, limit=limit)
+
+
+class PlayerBrowserView(BaseView):
+    def __init__(
+        self,
+        interaction: discord.Interaction,
+        session: AsyncSession,
+        *,
+        parent: BaseView,
+        player: Player,
+        specs: list[Specialization],
+        **kwargs,
+    ) -> None:
+        super().__init__(interaction, session, **kwargs)
+        self.parent = parent
+        self.player = player
+        self.spec_names = {spec.id: spec.name for spec in specs}
+        self.pager: Optional[Pager[Player]] = None
+
+        self.player_select: Optional[SingleSelect[Player]] = None
+        self.back_button: Optional[BaseButton] = None
+
+    async def load_database_objects(self) -> None:
+        self.pager = Pager(ServerPlayerSource(self.player))
+        await self.pager.open()
+
+    def build_ui(self) -> None:
+        self.player_select = SingleSelect[Player](
+            placeholder="Select a player",
+            option_label=lambda player: player.name,
+            option_value=lambda player: str(player.id),
+            callback=self.player_selected,
+        )
+        pager_buttons = self.pager.build_ui(self.player_select, self.change_page)
+        self.back_button = BaseButton(label="Back", style=discord.ButtonStyle.secondary, callback=self.back)
+        layout: Layout = [[self.player_select], [*pager_buttons, self.back_button]]
+        self.add_layout(layout)
+
+    def _create_build_embed(self, player: Player, build: dict[int, int]) -> discord.Embed:
+        lines = []
+        for level in range(5, 51, 5):
+            spec_id = build.get(level, None)
+            lines.append(f"* **Level {level}** - {self.spec_names.get(spec_id, '')}")
+        return discord.Embed(title=player.name, description="\n".join(lines))
+
+    @intercept_interaction
+    async def change_page(self, button: BaseButton) -> None:
+        await self.pager.turn(self, button)
+        self.update_view()
+        await self.interact()
+
+    @intercept_interaction
+    async def player_selected(self) -> None:
+        self.pager.selected = self.player_select.value
+        player = next(player for player in self.pager.objects if str(player.id) == self.pager.selected)
+        builds = await repository.player_builds(self.session, [player.id])
+        self.update_view()
+        await self.interact(embeds=[self._create_build_embed(player, builds[player.id])])
+
+    @intercept_interaction
+    async def back(self) -> None:
+        self.stop()
+        self.parent.interaction = self.interaction
+        await self.parent.interact()
+
+    def update_view(self) -> None:
+        self.pager.update_view()
@@ -2,11 +2,12 @@ from operator import attrgetter
 from typing import Optional
 
 import discord
-from sqlalchemy import and_
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
 
+from once_human import repository
+from once_human.bot.announcements import announce
+from once_human.bot.announcements import player_change
 from once_human.bot.ui.button import BaseButton
 from once_human.bot.ui.select import BaseSelect
 from once_human.bot.ui.select import DISCORD_SELECT_MAX
@@ -16,9 +17,13 @@ from once_human.bot.ui.select import SingleSelectGroup
 from once_human.bot.ui.views.base import BaseView
 from once_human.bot.ui.views.base import intercept_interaction
 from once_human.bot.ui.views.base import Layout
+from once_human.bot.ui.views.player_browser import PlayerBrowserView
 from once_human.bot.utils import ZERO_WIDTH_SPACE
+from once_human.locks import edit_locks
+from once_human.locks import LockTimeout
 from once_human.models import Player
 from once_human.models import Specialization
+from once_human.recommendation import recommender
 
 MIN_LEVEL = 5
 MAX_LEVEL = 50
@@ -30,9 +35,10 @@ class PlayerSpecializationView(BaseView):
         super().__init__(interaction, session, **kwargs)
         self.player: Player = player
         self.specs: list[Specialization] = []
-        self.server_players: Optional[list[Player]] = None
         self.specs_by_level: dict[int, list[Specialization]] = {}
         self.current_level: int = 5
+        self.suggested: list[int] = []
+        self.build: dict[int, Specialization] = {}
 
         self.clear_spec_button: Optional[BaseButton] = None
         self.first_spec_button: Optional[BaseButton] = None
@@ -45,18 +51,10 @@ class PlayerSpecializationView(BaseView):
         self.cancel_button: Optional[BaseButton] = None
 
     async def load_database_objects(self) -> None:
-        await self.session.refresh(self.player.server.scenario, ["specializations"])
-        self.specs = self.player.server.scenario.specializations
-        for spec in self.specs:
-            for level in spec.levels:
-                self.specs_by_level.setdefault(level, []).append(spec)
-        stmt = (
-            select(Player)
-            .where(and_(Player.server == self.player.server, Player.id != self.player.id))
-            .order_by(Player.lower_name)
-            .options(selectinload(Player.player_specializations))
-        )
-        self.server_players = (await self.session.scalars(stmt)).all()
+        self.specs_by_level = await repository.specs_by_level(self.session, self.player.server.scenario_id)
+        self.specs = list({spec.id: spec for specs in self.specs_by_level.values() for spec in specs}.values())
+        self.build = dict(self.player.specializations)
+        await recommender.load(self.session, self.player.server.scenario_id)
 
     def build_ui(self) -> None:
         self.clear_spec_button = BaseButton(label="Clear", style=discord.ButtonStyle.primary, callback=self.clear_spec)
@@ -76,13 +74,15 @@ class PlayerSpecializationView(BaseView):
                 placeholder = ZERO_WIDTH_SPACE
             return placeholder
 
-        size = int((max(len(specs) for specs in self.specs_by_level.values()) - 1) / DISCORD_SELECT_MAX) + 1
+        most_specs = max((len(specs) for specs in self.specs_by_level.values()), default=1)
+        size = int((most_specs - 1) / DISCORD_SELECT_MAX) + 1
         self.specs_select = SingleSelectGroup[Specialization](
             size,
             min_values=0,
             placeholder=placeholder_gen,
             option_label=attrgetter("name"),
             option_value=attrgetter("lower_name"),
+            option_description=self._spec_description,
             callback=self.select_spec,
         )
         # description = 5, 10, 15 | 2 players | 0/3 expert
@@ -108,22 +108,28 @@ class PlayerSpecializationView(BaseView):
 
     def _refresh_specs(self) -> None:
         level_specs = self.specs_by_level.get(self.current_level, [])
-        player_spec = self.player.specializations.get(self.current_level, None)
-        player_specs = [spec for level, spec in self.player.specializations.items() if level != self.current_level]
+        player_spec = self.build.get(self.current_level, None)
+        player_specs = [spec for level, spec in self.build.items() if level != self.current_level]
         level_specs = [spec for spec in level_specs if spec not in player_specs]
+        self.suggested = recommender.suggest(
+            self.player.server.scenario_id,
+            self.current_level,
+            frozenset(spec.id for spec in player_specs),
+            [spec.id for spec in level_specs],
+        )
         self.specs_select.refresh(level_specs, selected=player_spec)
 
+    def _spec_description(self, spec: Specialization) -> Optional[str]:
+        return "Suggested by similar players" if spec.id in self.suggested else None
+
     def _select_spec(self, spec: Optional[SingleSelected[Specialization]]) -> Optional[Specialization]:
         self.specs_select.selected = spec
-        level_specs = self.specs_by_level[self.current_level]
+        level_specs = self.specs_by_level.get(self.current_level, [])
         selected_spec = self.specs_select.selected_object(level_specs)
-        player_spec = self.player.specializations.get(self.current_level, None)
-        if selected_spec is None and player_spec:
-            del self.player.specializations[self.current_level]
-            self.session.add(self.player)
-        elif player_spec != selected_spec:
-            self.player.specializations[self.current_level] = selected_spec
-            self.session.add(self.player)
+        if selected_spec is None:
+            self.build.pop(self.current_level, None)
+        else:
+            self.build[self.current_level] = selected_spec
         return selected_spec
 
     @intercept_interaction
@@ -168,11 +174,29 @@ class PlayerSpecializationView(BaseView):
 
     @intercept_interaction
     async def players_view(self) -> None:
-        await self.interact(content="players_view")
+        players_view = await PlayerBrowserView.create(
+            self.interaction, self.session, parent=self, player=self.player, specs=self.specs
+        )
+        await players_view.interact(embeds=[])
 
     @intercept_interaction
     async def save(self) -> None:
-        await self.session.commit()
+        saved_build = {level: spec.id for level, spec in self.player.specializations.items()}
+        build = {level: spec.id for level, spec in self.build.items()}
+        try:
+            # the session is shared with the user view, which only opens this view without unsaved changes
+            async with edit_locks.saving(self.session, player_ids=[self.player.id]):
+                await repository.save_player_build(self.session, self.player, build)
+                await self.session.commit()
+        except StaleDataError:
+            await self.finish_stale()
+            return
+        except LockTimeout:
+            await self.send_error("Another save for this player is still running, try again")
+            return
+        await repository.reload_player_build(self.session, self.player)
+        recommender.update(self.player.server.scenario_id, set(saved_build.values()), set(build.values()))
+        announce(player_change(self.player, saved_build, build))
         await self.finish(content="Saved")
 
     @intercept_interaction
@@ -0,0 +1,91 @@
+from typing import Optional
+
+import discord
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from once_human import repository
+from once_human.bot.ui.button import BaseButton
+from once_human.bot.ui.views.base import BaseView
+from once_human.bot.ui.views.base import intercept_interaction
+from once_human.bot.ui.views.base import Layout
+from once_human.models import Server
+from once_human.models import Specialization
+from once_human.repository import HolderCursor
+
+PAGE_SIZE = 20
+
+
+class SpecHoldersView(BaseView):
+    def __init__(
+        self,
+        interaction: discord.Interaction,
+        session: AsyncSession,
+        *,
+        server: Server,
+        specialization: Specialization,
+        **kwargs,
+    ) -> None:
+        super().__init__(interaction, session, **kwargs)
+        self.server = server
+        self.specialization = specialization
+        self.cursors: list[Optional[HolderCursor]] = [None]
+        self.rows: list[Row] = []
+        self.has_next = False
+
+        self.prev_button: Optional[BaseButton] = None
+        self.next_button: Optional[BaseButton] = None
+        self.close_button: Optional[BaseButton] = None
+
+    async def load_database_objects(self) -> None:
+        rows = await repository.spec_holders(
+            self.session,
+            self.interaction.guild_id,
+            self.server.id,
+            self.specialization.id,
+            after=self.cursors[-1],
+            limit=PAGE_SIZE + 1,
+        )
+        self.has_next = len(rows) > PAGE_SIZE
+        self.rows = rows[:PAGE_SIZE]
+
+    def build_ui(self) -> None:
+        self.prev_button = BaseButton(emoji="⏪", callback=self.prev_page)
+        self.next_button = BaseButton(emoji="⏩", callback=self.next_page)
+        self.close_button = BaseButton(label="Close", style=discord.ButtonStyle.danger, callback=self.close)
+        layout: Layout = [[self.prev_button, self.next_button, self.close_button]]
+        self.add_layout(layout)
+        self._static_embeds = [self._create_embed()]
+
+    def _create_embed(self) -> discord.Embed:
+        lines = [f"* **Level {level}** - {name}" for level, name, _, _ in self.rows]
+        embed = discord.Embed(
+            title=f"{self.specialization.name} on {self.server.name}",
+            description="\n".join(lines) or "Nobody has this specialization",
+        )
+        embed.set_footer(text=f"Page {len(self.cursors)}")
+        return embed
+
+    async def _show_page(self) -> None:
+        await self.load_database_objects()
+        self.update_view()
+        await self.interact(embeds=[self._create_embed()])
+
+    @intercept_interaction
+    async def prev_page(self) -> None:
+        self.cursors.pop()
+        await self._show_page()
+
+    @intercept_interaction
+    async def next_page(self) -> None:
+        level, _, lower_name, player_id = self.rows[-1]
+        self.cursors.append((level, lower_name, player_id))
+        await self._show_page()
+
+    @intercept_interaction
+    async def close(self) -> None:
+        await self.finish()
+
+    def update_view(self) -> None:
+        self.prev_button.disabled = len(self.cursors) == 1
+        self.next_button.disabled = not self.has_next
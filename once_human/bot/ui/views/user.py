@@ -1,23 +1,37 @@
+import io
 from operator import attrgetter
 from typing import Optional
 
 import discord
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
 
+from once_human import database
+from once_human import repository
+from once_human.bot.announcements import announce
+from once_human.bot.announcements import BuildChange
+from once_human.bot.announcements import player_change
 from once_human.bot.ui.button import BaseButton
 from once_human.bot.ui.modal import BaseModal
+from once_human.bot.ui.pager import ListPageSource
+from once_human.bot.ui.pager import Pager
 from once_human.bot.ui.select import SingleSelect
 from once_human.bot.ui.select import SingleSelected
 from once_human.bot.ui.views.base import BaseView
 from once_human.bot.ui.views.base import intercept_interaction
 from once_human.bot.ui.views.base import Layout
 from once_human.bot.ui.views.player_specialization import PlayerSpecializationView
+from once_human.build_card import build_cards
+from once_human.build_code import encode_build
+from once_human.catalog import catalog
+from once_human.locks import edit_locks
+from once_human.locks import LockTimeout
 from once_human.models import Player
-from once_human.models import PlayerSpecialization
 from once_human.models import Server
 from once_human.models import User
+from once_human.recommendation import recommender
+
+CARD_FILENAME = "build.png"
 
 
 class UserView(BaseView):
@@ -27,8 +41,10 @@ class UserView(BaseView):
         super().__init__(interaction, session, **kwargs)
 
         self.discord_user = discord_user
+        self.guild_id: int = interaction.guild_id
         self.user: Optional[User] = None
         self.servers: Optional[list[Server]] = None
+        self.player_pager: Optional[Pager[Player]] = None
         self.new_player_button: Optional[BaseButton] = None
         self.rename_player_button: Optional[BaseButton] = None
         self.reset_player_button: Optional[BaseButton] = None
@@ -39,18 +55,14 @@ class UserView(BaseView):
         self.save_button: Optional[BaseButton] = None
         self.save_and_close_button: Optional[BaseButton] = None
         self.close_button: Optional[BaseButton] = None
+        # resets and deletes are only written and announced by _commit, under the edit locks, so no row lock
+        # is held while the user keeps the view open
+        self._build_changes: list[Optional[BuildChange]] = []
+        self._reset_players: list[Player] = []
+        self._deleted_names: set[str] = set()
 
     async def load_database_objects(self) -> None:
-        stmt = (
-            select(User)
-            .options(
-                selectinload(User.players)
-                .selectinload(Player.player_specializations)
-                .selectinload(PlayerSpecialization.specialization)
-            )
-            .where(User.id == self.discord_user.id)
-        )
-        user = (await self.session.scalars(stmt)).first()
+        user = await repository.user_with_builds(self.session, self.discord_user.id, self.guild_id)
         if not user:
             user = User(
                 id=self.discord_user.id,
@@ -59,8 +71,9 @@ class UserView(BaseView):
             )
             self.session.add(user)
         self.user = user
-        stmt = select(Server).order_by(Server.name).options(selectinload(Server.scenario))
-        self.servers = (await self.session.scalars(stmt)).all()
+        self.servers = await repository.servers(self.session)
+        self.player_pager = Pager(ListPageSource(user.players))
+        await self.player_pager.open()
 
     def build_ui(self) -> None:
         user: User = self.user
@@ -81,7 +94,7 @@ class UserView(BaseView):
             option_description=lambda player: f"{len(player.specializations)} specs selected",
             callback=self.player_selected,
         )
-        self.player_select.refresh(user.players)
+        player_pager_buttons = self.player_pager.build_ui(self.player_select, self.change_player_page)
         self.server_select = SingleSelect[Server](
             placeholder="Select server",
             option_label=attrgetter("name"),
@@ -106,15 +119,19 @@ class UserView(BaseView):
             [self.new_player_button, self.rename_player_button, self.reset_player_button, self.delete_player_button],
             [self.player_select],
             [self.server_select],
-            [],
+            player_pager_buttons,
             [self.modify_specs_button, self.save_button, self.save_and_close_button, self.close_button],
         ]
         self.add_layout(layout)
 
-    def _select_player(self, player: Optional[SingleSelected[Player]]) -> Optional[Player]:
+    def _selected_player(self) -> Optional[Player]:
         user: User = self.user
-        self.player_select.selected = player
-        selected_player = self.player_select.selected_object(user.players)
+        selected_value = self.player_pager.selected
+        return next((player for player in user.players if player.lower_name == selected_value), None)
+
+    def _select_player(self, player: Optional[SingleSelected[Player]]) -> Optional[Player]:
+        self.player_pager.selected = player
+        selected_player = self._selected_player()
         self._select_server(selected_player.server if selected_player else None)
         return selected_player
 
@@ -147,15 +164,34 @@ class UserView(BaseView):
             spec = f"* **Level {level}** - {player_spec_str}"
             specs.append(spec)
         embed = discord.Embed(description="\n".join(specs))
+        if player.specializations:
+            build = {level: spec.id for level, spec in player.specializations.items()}
+            embed.set_footer(text=f"Build code: {encode_build(build)}")
         return embed
 
+    async def _show_player(self, player: Player, content: Optional[str] = None) -> None:
+        embed = self._create_player_embed(player)
+        await self.interact(content=content, embeds=[embed], attachments=[])
+        await self._attach_card(player, embed)
+
+    async def _attach_card(self, player: Player, embed: discord.Embed) -> None:
+        # a cold icon cache or process pool takes longer than the 3s Discord gives for the first response, so the
+        # card is added to the already answered message
+        if build_cards is None or not player.specializations:
+            return
+        interaction = self.interaction
+        snapshot = await catalog.get(database.AsyncSessionFactory)
+        card = await build_cards.render({level: spec.id for level, spec in player.specializations.items()}, snapshot)
+        if card is None or self.is_finished() or self.interaction is not interaction:
+            return
+        embed.set_image(url=f"attachment://{CARD_FILENAME}")
+        await interaction.edit_original_response(
+            embeds=self._embeds, view=self, attachments=[discord.File(io.BytesIO(card), CARD_FILENAME)]
+        )
+
     @intercept_interaction
     async def new_player(self) -> None:
         user: User = self.user
-        if len(user.players) >= 25:
-            await self.send_error("You are limited to 25 players")
-            return
-
         name_input = UserView._create_player_input()
         input_modal = BaseModal(self, title="New Player", text_inputs=[name_input])
         await input_modal.show()
@@ -166,25 +202,36 @@ class UserView(BaseView):
                 continue
             await self.send_error(f"**{player.name}** already exists")
             return
+        if value.lower() in self._deleted_names:
+            await self.send_error(f"Save before reusing the name of the removed player **{value}**")
+            return
 
-        player = Player(name=value)
+        player = Player(name=value, guild_id=self.guild_id)
         self.session.add(player)
         user.players.append(player)
         user.players.sort(key=attrgetter("lower_name"))
-        self.player_select.refresh(user.players, selected=player)
+        await self.player_pager.show(player)
         self.server_select.selected = None
         self.update_view()
 
-        await self.interact(embeds=[self._create_player_embed(player)])
+        await self._show_player(player)
 
     @intercept_interaction
     async def reset_player(self) -> None:
-        await self.interact(content="reset player")
+        selected_player: Player = self._selected_player()
+        saved_build = {level: spec.id for level, spec in selected_player.specializations.items()}
+        repository.detach_player_build(self.session, selected_player)
+        if selected_player.id is not None and selected_player not in self._reset_players:
+            self._reset_players.append(selected_player)
+        self._build_changes.append(player_change(selected_player, saved_build, {}))
+        await self.player_pager.show(selected_player)
+        self.update_view()
+        await self._show_player(selected_player, content="Player reset")
 
     @intercept_interaction
     async def rename_player(self) -> None:
         user: User = self.user
-        selected_player: Player = self.player_select.selected_object(user.players)
+        selected_player: Player = self._selected_player()
 
         name_input = UserView._create_player_input(default=selected_player.name)
         input_modal = BaseModal(self, title="Rename Player", text_inputs=[name_input])
@@ -202,11 +249,14 @@ class UserView(BaseView):
         ):
             await self.send_error("Player name already exists")
             return
+        if value.lower() in self._deleted_names:
+            await self.send_error(f"Save before reusing the name of the removed player **{value}**")
+            return
 
         selected_player.name = value
         self.session.add(selected_player)
         user.players.sort(key=attrgetter("lower_name"))
-        self.player_select.refresh(user.players, selected=selected_player)
+        await self.player_pager.show(selected_player)
         self.update_view()
 
         await self.interact(content="Player name changed")
@@ -214,68 +264,119 @@ class UserView(BaseView):
     @intercept_interaction
     async def delete_player(self) -> None:
         user: User = self.user
-        selected_value = self.player_select.selected
+        selected_value = self.player_pager.selected
         for i, player in enumerate(user.players):
             if player.lower_name == selected_value:
+                saved_build = {level: spec.id for level, spec in player.specializations.items()}
+                self._build_changes.append(player_change(player, saved_build, {}))
+                if player in self._reset_players:
+                    self._reset_players.remove(player)
+                # the orphan is deleted by the flush in _commit, after any insert, so the name stays taken until then
+                if player.id is not None:
+                    self._deleted_names.add(player.lower_name)
                 del user.players[i]
-                await self.session.flush()
                 break
         self.session.add(user)
-        self.player_select.refresh(user.players, selected=None)
+        self.player_pager.selected = None
+        await self.player_pager.show()
         self.server_select.selected = None
         self.update_view()
-        await self.interact(content="Removed player", embeds=[])
+        await self.interact(content="Removed player", embeds=[], attachments=[])
+
+    @intercept_interaction
+    async def change_player_page(self, button: BaseButton) -> None:
+        await self.player_pager.turn(self, button)
+        self.update_view()
+        await self.interact()
 
     @intercept_interaction
     async def player_selected(self) -> None:
         selected_player = self._select_player(self.player_select.value)
         self.update_view()
-        await self.interact(embeds=[UserView._create_player_embed(selected_player)])
+        await self._show_player(selected_player)
 
     @intercept_interaction
     async def server_selected(self) -> None:
         selected_server = self._select_server(self.server_select.value)
-        user: User = self.user
-        selected_player = self.player_select.selected_object(user.players)
+        selected_player = self._selected_player()
         if selected_player.server != selected_server:
             selected_player.server = selected_server
             self.session.add(selected_player)
         self.update_view()
         await self.interact()
 
+    def _has_unsaved_changes(self) -> bool:
+        session = self.session
+        return bool(self._build_changes or self._reset_players or session.new or session.dirty or session.deleted)
+
     @intercept_interaction
     async def modify_specs(self) -> None:
-        user: User = self.user
+        # the specializations view commits this session, which must not carry these changes past their locks
+        if self._has_unsaved_changes():
+            await self.send_error("Save your changes before editing specializations")
+            return
         spec_view = await PlayerSpecializationView.create(
-            self.interaction, self.session, player=self.player_select.selected_object(user.players)
+            self.interaction, self.session, player=self._selected_player()
         )
-        await self.interact(view=spec_view, embeds=[])
+        await self.interact(view=spec_view, embeds=[], attachments=[])
+
+    def _clear_pending(self) -> None:
+        self._build_changes.clear()
+        self._reset_players.clear()
+        self._deleted_names.clear()
+
+    async def _commit(self) -> bool:
+        player_ids = [player.id for player in self.user.players]
+        try:
+            async with edit_locks.saving(self.session, user_id=self.user.id, player_ids=player_ids):
+                await self.session.flush()
+                for player in self._reset_players:
+                    await repository.save_player_build(self.session, player, {})
+                await self.session.commit()
+        except StaleDataError:
+            self._clear_pending()
+            await self.finish_stale()
+            return False
+        except LockTimeout:
+            await self.send_error("Another save for these players is still running, try again")
+            return False
+        # resets and deletes move the counters here, server moves are left to the hourly reconcile job
+        snapshot = await catalog.get(database.AsyncSessionFactory)
+        for change in self._build_changes:
+            if change and change.server_id in snapshot.servers:
+                scenario_id = snapshot.servers[change.server_id].scenario_id
+                recommender.update(scenario_id, set(change.old.values()), set(change.new.values()))
+            announce(change)
+        self._clear_pending()
+        return True
 
     @intercept_interaction
     async def save(self) -> None:
-        await self.session.commit()
-        await self.refresh(content="refreshed")
+        if await self._commit():
+            await self.refresh(content="refreshed")
 
     @intercept_interaction
     async def save_and_close(self) -> None:
-        await self.session.commit()
-        await self.finish(content="Saved")
+        if await self._commit():
+            await self.finish(content="Saved")
 
     @intercept_interaction
     async def close(self) -> None:
         await self.session.rollback()
+        self._clear_pending()
         await self.finish(content="id")
 
     @intercept_interaction
     async def cancel(self) -> None:
         await self.session.rollback()
+        self._clear_pending()
         await self.finish(content="Changes Canceled")
 
     def update_view(self) -> None:
-        self.player_select.show()
+        self.player_pager.update_view()
         self.server_select.show()
-        self.server_select.disabled = self.player_select.disabled
-        player_is_selected = self.player_select.has_selected
+        player_is_selected = self.player_pager.selected is not None
+        self.server_select.disabled = not player_is_selected
         self.rename_player_button.disabled = not player_is_selected
         self.reset_player_button.disabled = not player_is_selected
         self.delete_player_button.disabled = not player_is_selected
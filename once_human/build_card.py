@@ -0,0 +1,249 @@
+import asyncio
+import hashlib
+import importlib.util
+import io
+import os
+import time
+from concurrent.futures import Executor
+from functools import cache
+from typing import Optional
+
+import aiohttp
+
+from once_human import metrics
+from once_human.build_code import LEVELS
+from once_human.cache import LRUCache
+from once_human.catalog import CatalogSnapshot
+from once_human.catalog import CatalogSpecialization
+from once_human.config import config
+
+# bump when the layout changes so cards rendered by an older version are not served from disk
+CARD_VERSION = 1
+COLUMNS = 5
+ICON_SIZE = 96
+CELL_WIDTH = 160
+CELL_HEIGHT = ICON_SIZE + 44
+PADDING = 8
+BACKGROUND = (47, 49, 54)
+EMPTY_SLOT = (64, 68, 75)
+TEXT = (220, 221, 222)
+STAND_IN_DEFAULT = "default.png"
+
+type CardEntry = tuple[int, Optional[str], str]
+
+build_card_failures = metrics.Counter(
+    "once_human_build_card_failures_total", "Icon downloads rejected and cards that failed to render", ("stage",)
+)
+
+
+@cache
+def available() -> bool:
+    # Pillow is optional, without it the player embed keeps its text lines only
+    return importlib.util.find_spec("PIL") is not None
+
+
+def render_card(entries: list[CardEntry]) -> bytes:
+    from PIL import Image
+    from PIL import ImageDraw
+    from PIL import ImageFont
+
+    rows = -(-len(entries) // COLUMNS)
+    card = Image.new("RGB", (COLUMNS * CELL_WIDTH + PADDING, rows * CELL_HEIGHT + PADDING), BACKGROUND)
+    draw = ImageDraw.Draw(card)
+    font = ImageFont.load_default()
+    for i, (level, icon_path, name) in enumerate(entries):
+        x = PADDING + (i % COLUMNS) * CELL_WIDTH
+        y = PADDING + (i // COLUMNS) * CELL_HEIGHT
+        icon_x = x + (CELL_WIDTH - PADDING - ICON_SIZE) // 2
+        if icon_path:
+            with Image.open(icon_path) as icon:
+                icon = icon.convert("RGBA").resize((ICON_SIZE, ICON_SIZE))
+                card.paste(icon, (icon_x, y), icon)
+        else:
+            draw.rectangle((icon_x, y, icon_x + ICON_SIZE, y + ICON_SIZE), fill=EMPTY_SLOT)
+        draw.text((x, y + ICON_SIZE + 4), f"Level {level}", fill=TEXT, font=font)
+        label = name if len(name) <= 24 else name[:23] + "…"
+        draw.text((x, y + ICON_SIZE + 20), label, fill=TEXT, font=font)
+    buffer = io.BytesIO()
+    card.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def _is_image(data: bytes) -> bool:
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.verify()
+    except Exception:
+        return False
+    return True
+
+
+def card_key(entries: list[CardEntry]) -> str:
+    # icon paths are part of the key so a card drawn with a stand-in is redrawn once the real icon is cached
+    data = repr((CARD_VERSION, entries)).encode()
+    return hashlib.sha1(data).hexdigest()
+
+
+def _read(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as fp:
+            data = fp.read()
+        # the mtime is what pruning goes by, so cards still being shown are kept
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return data
+
+
+def _write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as fp:
+        fp.write(data)
+    os.replace(tmp_path, path)
+
+
+def _prune(directory: str, max_files: int) -> None:
+    entries: list[tuple[float, str]] = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                pass
+    for _, path in sorted(entries)[: len(entries) - max_files]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class IconCache:
+    def __init__(self, directory: str, stand_in_directory: str, *, timeout: float = 10, retry_after: float = 600):
+        self.directory = directory
+        self.stand_in_directory = stand_in_directory
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._downloads: dict[int, asyncio.Task[bool]] = {}
+        self._failed: dict[int, float] = {}
+
+    def path(self, spec_id: int) -> str:
+        return os.path.join(self.directory, f"{spec_id}.png")
+
+    def stand_in(self, spec_id: int) -> Optional[str]:
+        for name in (f"{spec_id}.png", STAND_IN_DEFAULT):
+            path = os.path.join(self.stand_in_directory, name)
+            if os.path.exists(path):
+                return path
+        return None
+
+    async def _download(self, spec: CatalogSpecialization) -> bool:
+        if self._http is None:
+            self._http = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        try:
+            async with self._http.get(spec.icon_url) as resp:
+                resp.raise_for_status()
+                # an error page or anything else that is not an image must not end up in the icon cache
+                valid = resp.content_type.startswith("image/")
+                data = await resp.read() if valid else b""
+            valid = valid and await asyncio.to_thread(_is_image, data)
+            if valid:
+                await asyncio.to_thread(_write, self.path(spec.id), data)
+            else:
+                build_card_failures.inc("download")
+        except (aiohttp.ClientError, TimeoutError, OSError):
+            valid = False
+        if not valid:
+            self._failed[spec.id] = time.monotonic() + self.retry_after
+        return valid
+
+    async def get(self, spec: CatalogSpecialization) -> Optional[str]:
+        path = self.path(spec.id)
+        if os.path.exists(path):
+            return path
+        if spec.icon_url and self._failed.get(spec.id, 0) <= time.monotonic():
+            task = self._downloads.get(spec.id, None)
+            if task is None:
+                task = self._downloads[spec.id] = asyncio.create_task(self._download(spec))
+                task.add_done_callback(lambda _: self._downloads.pop(spec.id, None))
+            if await asyncio.shield(task):
+                return path
+        return self.stand_in(spec.id)
+
+    async def close(self) -> None:
+        if self._http:
+            await self._http.close()
+            self._http = None
+
+
+class BuildCardRenderer:
+    def __init__(
+        self,
+        icons: IconCache,
+        directory: str,
+        *,
+        executor: Optional[Executor] = None,
+        memory_size: int = 256,
+        max_files: int = 5000,
+    ) -> None:
+        self.icons = icons
+        self.directory = directory
+        self.executor = executor
+        self.memory: LRUCache[str, bytes] = LRUCache(memory_size, name="build_cards")
+        self.max_files = max_files
+        self._writes = 0
+
+    async def _entries(self, build: dict[int, int], snapshot: CatalogSnapshot) -> list[CardEntry]:
+        specs = [snapshot.specializations.get(build.get(level, None), None) for level in LEVELS]
+        icon_paths = await asyncio.gather(*[self.icons.get(spec) for spec in specs if spec is not None])
+        paths = iter(icon_paths)
+        return [
+            (level, next(paths), spec.name) if spec is not None else (level, None, "")
+            for level, spec in zip(LEVELS, specs)
+        ]
+
+    async def render(self, build: dict[int, int], snapshot: CatalogSnapshot) -> Optional[bytes]:
+        if not available() or not build:
+            return None
+        try:
+            entries = await self._entries(build, snapshot)
+            key = card_key(entries)
+            card = self.memory.get(key)
+            if card is not None:
+                return card
+            path = os.path.join(self.directory, f"{key}.png")
+            card = await asyncio.to_thread(_read, path)
+            if card is None:
+                card = await asyncio.get_running_loop().run_in_executor(self.executor, render_card, entries)
+                await asyncio.to_thread(_write, path, card)
+                await self._written()
+        except Exception:
+            # a broken icon or a full disk costs the picture, the embed still shows the build as text
+            build_card_failures.inc("render")
+            return None
+        self.memory.put(key, card)
+        return card
+
+    async def _written(self) -> None:
+        # listing the directory is not free, so only every tenth of the limit in new cards
+        self._writes += 1
+        if (self._writes - 1) % max(1, self.max_files // 10) == 0:
+            await asyncio.to_thread(_prune, self.directory, self.max_files)
+
+
+build_cards: Optional[BuildCardRenderer] = None
+if config.build_cards.enabled:
+    build_cards = BuildCardRenderer(
+        IconCache(
+            config.build_cards.icon_dir,
+            config.build_cards.stand_in_dir,
+            timeout=config.build_cards.download_timeout,
+            retry_after=config.build_cards.retry_after,
+        ),
+        config.build_cards.card_dir,
+        memory_size=config.build_cards.memory_size,
+        max_files=config.build_cards.max_files,
+    )
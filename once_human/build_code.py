@@ -0,0 +1,95 @@
+import base64
+import re
+from typing import Optional
+
+from once_human.catalog import CatalogSnapshot
+from once_human.name_index import NameIndex
+
+LEVELS = tuple(range(5, 51, 5))
+CODE_PREFIX = "OH"
+CODE_RE = re.compile(rf"^{CODE_PREFIX}[A-Za-z0-9_-]+$")
+LINE_RE = re.compile(r"^(?:level\s*)?(\d{1,2})\s*[-:.)]?\s*(.*)$", re.IGNORECASE)
+
+
+def encode_build(build: dict[int, int]) -> str:
+    data = bytearray()
+    for level in LEVELS:
+        value = build.get(level, 0)
+        while value >= 0x80:
+            data.append(value & 0x7F | 0x80)
+            value >>= 7
+        data.append(value)
+    return CODE_PREFIX + base64.urlsafe_b64encode(bytes(data)).decode().rstrip("=")
+
+
+def decode_build(code: str) -> dict[int, int]:
+    code = code.strip()
+    if not CODE_RE.match(code):
+        raise ValueError("Not a build code")
+    payload = code[len(CODE_PREFIX) :]
+    try:
+        data = base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))
+    except ValueError:
+        raise ValueError("Build code is corrupted") from None
+    values: list[int] = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            values.append(value)
+            value = shift = 0
+    if len(values) != len(LEVELS) or shift:
+        raise ValueError("Build code is corrupted")
+    return {level: spec_id for level, spec_id in zip(LEVELS, values) if spec_id}
+
+
+def is_build_code(text: str) -> bool:
+    return CODE_RE.match(text.strip()) is not None
+
+
+def parse_build_text(text: str, index: NameIndex) -> tuple[dict[int, int], list[str]]:
+    build: dict[int, int] = {}
+    errors: list[str] = []
+    next_level = LEVELS[0]
+    for line in text.splitlines():
+        line = line.replace("*", "").strip()
+        if not line:
+            continue
+        match = LINE_RE.match(line)
+        if match:
+            level, name = int(match.group(1)), match.group(2).strip()
+        else:
+            level, name = next_level, line
+        next_level = level + 5
+        if level not in LEVELS:
+            errors.append(f"Level {level} is not a specialization level")
+            continue
+        if not name:
+            continue
+        best = index.best(name)
+        if best is None:
+            errors.append(f"Level {level}: no specialization looks like **{name}**")
+            continue
+        build[level] = best[0]
+    return build, errors
+
+
+def validate_build(build: dict[int, int], snapshot: CatalogSnapshot, scenario_id: Optional[int]) -> list[str]:
+    errors: list[str] = []
+    seen: dict[int, int] = {}
+    for level, spec_id in sorted(build.items()):
+        spec = snapshot.specializations.get(spec_id, None)
+        if level not in LEVELS:
+            errors.append(f"Level {level} is not a specialization level")
+        elif spec is None:
+            errors.append(f"Level {level}: unknown specialization")
+        elif level not in spec.levels:
+            errors.append(f"Level {level}: **{spec.name}** is not available at this level")
+        elif scenario_id is not None and scenario_id not in spec.scenario_ids:
+            errors.append(f"Level {level}: **{spec.name}** is not part of this scenario")
+        elif spec_id in seen:
+            errors.append(f"Level {level}: **{spec.name}** is already used at level {seen[spec_id]}")
+        else:
+            seen[spec_id] = level
+    return errors
@@ -0,0 +1,44 @@
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Optional
+from weakref import WeakValueDictionary
+
+
+caches: WeakValueDictionary[str, "LRUCache"] = WeakValueDictionary()
+
+
+class LRUCache[K: Hashable, V]:
+    def __init__(self, maxsize: int = 128, *, name: Optional[str] = None) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[K, V] = OrderedDict()
+        if name:
+            caches[name] = self
+
+    def get(self, key: K) -> Optional[V]:
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: K, value: V) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import asdict
+from dataclasses import dataclass
+from typing import Callable
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import selectinload
+
+from once_human.models import Scenario
+from once_human.models import Server
+from once_human.models import Specialization
+
+
+@dataclass(frozen=True)
+class CatalogScenario:
+    id: int
+    name: str
+    server_ids: tuple[int, ...]
+    specialization_ids: tuple[int, ...]
+
+
+@dataclass(frozen=True)
+class CatalogServer:
+    id: int
+    name: str
+    scenario_id: int
+
+
+@dataclass(frozen=True)
+class CatalogSpecialization:
+    id: int
+    name: str
+    levels: tuple[int, ...]
+    type: str
+    affected: str
+    category: str
+    identity: str
+    description: str
+    icon_url: Optional[str]
+    scenario_ids: tuple[int, ...]
+
+
+@dataclass(frozen=True)
+class SerializedCatalog:
+    body: bytes
+    etag: str
+
+
+class CatalogSnapshot:
+    def __init__(
+        self,
+        scenarios: list[CatalogScenario],
+        servers: list[CatalogServer],
+        specializations: list[CatalogSpecialization],
+    ) -> None:
+        self.scenarios = {scenario.id: scenario for scenario in scenarios}
+        self.servers = {server.id: server for server in servers}
+        self.specializations = {spec.id: spec for spec in specializations}
+        self.serialized: dict[str, SerializedCatalog] = {}
+        for name, entries in [("scenarios", scenarios), ("servers", servers), ("specializations", specializations)]:
+            body = json.dumps([asdict(entry) for entry in entries], separators=(",", ":")).encode()
+            self.serialized[name] = SerializedCatalog(body, f'"{hashlib.sha1(body).hexdigest()[:16]}"')
+        self.version = hashlib.sha1("".join(s.etag for s in self.serialized.values()).encode()).hexdigest()[:16]
+
+
+class Catalog:
+    def __init__(self, *, ttl: float = 300) -> None:
+        self.ttl = ttl
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._listeners: list[Callable[[CatalogSnapshot], None]] = []
+
+    def add_listener(self, listener: Callable[[CatalogSnapshot], None]) -> None:
+        self._listeners.append(listener)
+
+    @property
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        return self._snapshot
+
+    @property
+    def stale(self) -> bool:
+        return self._snapshot is None or time.monotonic() - self._loaded_at >= self.ttl
+
+    def invalidate(self) -> None:
+        self._loaded_at = 0.0
+
+    async def get(self, session_factory: async_sessionmaker) -> CatalogSnapshot:
+        if not self.stale:
+            return self._snapshot
+        async with self._lock:
+            if self.stale:
+                await self._load(session_factory)
+        return self._snapshot
+
+    def refresh(self, session_factory: async_sessionmaker) -> None:
+        if self.stale and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self.get(session_factory))
+
+    async def _load(self, session_factory: async_sessionmaker) -> None:
+        async with session_factory() as session:
+            scenarios = (
+                await session.scalars(
+                    select(Scenario)
+                    .order_by(Scenario.lower_name)
+                    .options(selectinload(Scenario.servers), selectinload(Scenario.specializations))
+                )
+            ).all()
+            servers = (await session.scalars(select(Server).order_by(Server.lower_name))).all()
+            specs = (
+                await session.scalars(
+                    select(Specialization)
+                    .order_by(Specialization.lower_name)
+                    .options(selectinload(Specialization.scenarios))
+                )
+            ).all()
+            snapshot = CatalogSnapshot(
+                [
+                    CatalogScenario(
+                        id=scenario.id,
+                        name=scenario.name,
+                        server_ids=tuple(server.id for server in scenario.servers),
+                        specialization_ids=tuple(spec.id for spec in scenario.specializations),
+                    )
+                    for scenario in scenarios
+                ],
+                [CatalogServer(id=server.id, name=server.name, scenario_id=server.scenario_id) for server in servers],
+                [
+                    CatalogSpecialization(
+                        id=spec.id,
+                        name=spec.name,
+                        levels=tuple(spec.levels),
+                        type=spec.type,
+                        affected=spec.affected,
+                        category=spec.category,
+                        identity=spec.identity,
+                        description=spec.description,
+                        icon_url=spec.icon_url,
+                        scenario_ids=tuple(scenario.id for scenario in spec.scenarios),
+                    )
+                    for spec in specs
+                ],
+            )
+        previous_version = self._snapshot.version if self._snapshot else None
+        self._snapshot = snapshot
+        self._loaded_at = time.monotonic()
+        if snapshot.version != previous_version:
+            for listener in self._listeners:
+                listener(snapshot)
+
+
+catalog = Catalog()
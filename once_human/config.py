@@ -7,6 +7,7 @@ from dataclasses import dataclass
 from dataclasses import field
 from dataclasses import InitVar
 from functools import lru_cache
+from typing import Optional
 
 
 @dataclass
@@ -18,6 +19,10 @@ class DatabaseSettings(abc.ABC):
     def url(self) -> str:
         raise NotImplementedError
 
+    @property
+    def replica_urls(self) -> list[str]:
+        return []
+
 
 @dataclass
 class GenericDatabaseSettings(DatabaseSettings):
@@ -26,15 +31,26 @@ class GenericDatabaseSettings(DatabaseSettings):
     host: str
     name: str
     driver: str = "default"
+    replicas: list[str] = field(default_factory=list)
+    partition_by_guild: bool = False
+    replica_check_interval: float = 10
+    read_your_writes_window: float = 10
 
-    @property
-    def url(self):
+    def _url(self, host: str) -> str:
         dialect = self.dialect
         if self.driver != "default":
             dialect = f"{self.dialect}+{self.driver}"
-        url = f"{dialect}://{self.user}:{self.password}@{self.host}/{self.name}"
+        url = f"{dialect}://{self.user}:{self.password}@{host}/{self.name}"
         return url
 
+    @property
+    def url(self):
+        return self._url(self.host)
+
+    @property
+    def replica_urls(self) -> list[str]:
+        return [self._url(host) for host in self.replicas]
+
 
 @dataclass
 class GoogleSheet:
@@ -80,16 +96,125 @@ class GoogleSheetsDatabaseSettings(DatabaseSettings):
 @dataclass
 class DiscordSettings:
     token: str
-    guild: str
+    guild: Optional[str] = None
     announcement_channel: int = None
     user_role: int = None
     admin_role: int = None
 
 
+@dataclass
+class RecorderSettings:
+    enabled: bool = False
+    path: str = "traces/interactions.jsonl"
+    salt: str = ""
+    flush_every: int = 100
+    max_sessions: int = 10000
+
+    def __post_init__(self):
+        # without a secret salt the hashed user ids can be matched by hashing known ids
+        if self.enabled and not self.salt:
+            raise ValueError("recorder.salt must be set to enable the recorder")
+
+
+@dataclass
+class ApiSettings:
+    enabled: bool = False
+    host: str = "127.0.0.1"
+    port: int = 8080
+    players_ttl: float = 15
+    page_size: int = 100
+    # /export dumps whole guilds, it stays off until a token is configured
+    export_token: str = ""
+
+
+@dataclass
+class TracingSettings:
+    enabled: bool = False
+    sample_rate: float = 0.1
+    ring_size: int = 1000
+    path: Optional[str] = "traces/spans.jsonl"
+    flush_every: int = 50
+
+
+@dataclass
+class MetricsSettings:
+    enabled: bool = False
+    host: str = "127.0.0.1"
+    port: int = 9100
+    lag_interval: float = 0.1
+
+
+@dataclass
+class WatchdogSettings:
+    enabled: bool = True
+    threshold: float = 0.25
+    max_findings: int = 100
+    stack_limit: int = 30
+
+
+@dataclass
+class MemberSyncSettings:
+    enabled: bool = False
+    window: float = 2
+    batch_size: int = 5000
+
+
+@dataclass
+class AnnouncementSettings:
+    enabled: bool = True
+    queue_size: int = 1000
+    window: float = 30
+    min_interval: float = 5
+
+
+@dataclass
+class SchedulerSettings:
+    enabled: bool = True
+    jitter: float = 0.1
+    coverage_digest_interval: float = 24 * 60 * 60
+    reconcile_interval: float = 60 * 60
+    cleanup_interval: float = 24 * 60 * 60
+    job_run_retention_days: int = 30
+    coverage_budget: float = 2
+
+
+@dataclass
+class BuildCardSettings:
+    enabled: bool = True
+    icon_dir: str = "cache/icons"
+    stand_in_dir: str = "assets/icons"
+    card_dir: str = "cache/cards"
+    memory_size: int = 256
+    max_files: int = 5000
+    download_timeout: float = 10
+    retry_after: float = 600
+
+
+@dataclass
+class ArchiveSettings:
+    # moves rows out of the live tables and updated_at only follows build edits, so deployments opt in
+    enabled: bool = False
+    interval: float = 24 * 60 * 60
+    inactive_days: int = 180
+    chunk_size: int = 500
+    pause: float = 1
+    max_chunks: int = 200
+
+
 @dataclass
 class Settings:
     db: DatabaseSettings
     discord: DiscordSettings
+    recorder: RecorderSettings = field(default_factory=RecorderSettings)
+    api: ApiSettings = field(default_factory=ApiSettings)
+    tracing: TracingSettings = field(default_factory=TracingSettings)
+    metrics: MetricsSettings = field(default_factory=MetricsSettings)
+    watchdog: WatchdogSettings = field(default_factory=WatchdogSettings)
+    member_sync: MemberSyncSettings = field(default_factory=MemberSyncSettings)
+    announcements: AnnouncementSettings = field(default_factory=AnnouncementSettings)
+    scheduler: SchedulerSettings = field(default_factory=SchedulerSettings)
+    build_cards: BuildCardSettings = field(default_factory=BuildCardSettings)
+    archive: ArchiveSettings = field(default_factory=ArchiveSettings)
 
 
 @lru_cache
@@ -108,7 +233,30 @@ def load_config() -> Settings:
         cls = GenericDatabaseSettings
     db_settings = cls(db_dialect, **data["db"][db_dialect])
     discord_settings = DiscordSettings(**data["discord"])
-    settings = Settings(db_settings, discord_settings)
+    recorder_settings = RecorderSettings(**data.get("recorder", {}))
+    api_settings = ApiSettings(**data.get("api", {}))
+    tracing_settings = TracingSettings(**data.get("tracing", {}))
+    metrics_settings = MetricsSettings(**data.get("metrics", {}))
+    watchdog_settings = WatchdogSettings(**data.get("watchdog", {}))
+    member_sync_settings = MemberSyncSettings(**data.get("member_sync", {}))
+    announcement_settings = AnnouncementSettings(**data.get("announcements", {}))
+    scheduler_settings = SchedulerSettings(**data.get("scheduler", {}))
+    build_card_settings = BuildCardSettings(**data.get("build_cards", {}))
+    archive_settings = ArchiveSettings(**data.get("archive", {}))
+    settings = Settings(
+        db_settings,
+        discord_settings,
+        recorder=recorder_settings,
+        api=api_settings,
+        tracing=tracing_settings,
+        metrics=metrics_settings,
+        watchdog=watchdog_settings,
+        member_sync=member_sync_settings,
+        announcements=announcement_settings,
+        scheduler=scheduler_settings,
+        build_cards=build_card_settings,
+        archive=archive_settings,
+    )
 
     return settings
 
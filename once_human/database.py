@@ -1,18 +1,159 @@
+import asyncio
+import random
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy import text
+from sqlalchemy import UpdateBase
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
 
+from once_human import metrics
 from once_human.config import config
+from once_human.locks import advisory_key
 from once_human.models import Base
+from once_human.models import PlayerSpecialization
+from once_human.tracing import tracer
+
+engine = create_async_engine(config.db.url, echo=True, poolclass=metrics.TimedQueuePool)
+
+
+class ReplicaPool:
+    def __init__(self, engines: list[AsyncEngine], *, timeout: float = 2) -> None:
+        self.engines = engines
+        self.timeout = timeout
+        self.healthy: set[AsyncEngine] = set(engines)
+
+    def choose(self) -> Optional[AsyncEngine]:
+        healthy = [replica for replica in self.engines if replica in self.healthy]
+        return random.choice(healthy) if healthy else None
+
+    async def _check(self, replica: AsyncEngine) -> None:
+        try:
+            async with asyncio.timeout(self.timeout):
+                async with replica.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+        except Exception:
+            self.healthy.discard(replica)
+        else:
+            self.healthy.add(replica)
+
+    async def check(self) -> None:
+        await asyncio.gather(*[self._check(replica) for replica in self.engines])
+
+    async def monitor(self, interval: float) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(interval)
+
+
+replicas = ReplicaPool([create_async_engine(url, poolclass=metrics.TimedQueuePool) for url in config.db.replica_urls])
+_recent_writers: dict[int, float] = {}
+
+
+def pool_stats() -> dict[metrics.LabelValues, float]:
+    stats: dict[metrics.LabelValues, float] = {}
+    for name, pool_engine in [("primary", engine), *[(f"replica{i}", r) for i, r in enumerate(replicas.engines)]]:
+        pool = pool_engine.pool
+        stats[(name, "checked_out")] = pool.checkedout()
+        stats[(name, "overflow")] = max(pool.overflow(), 0)
+        stats[(name, "idle")] = pool.checkedin()
+    return stats
+
+
+for timed_engine in [engine, *replicas.engines]:
+    metrics.query_timer.instrument(timed_engine)
+pool_connections = metrics.Gauge(
+    "once_human_db_pool_connections", "Pooled connections by state", ("engine", "state"), collect=pool_stats
+)
+if tracer:
+    for traced_engine in [engine, *replicas.engines]:
+        tracer.instrument(traced_engine)
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, **kwargs) -> Engine:
+        if not replicas.engines:
+            return engine.sync_engine
+        if self.info.get("primary", False) or self._flushing or isinstance(clause, UpdateBase):
+            self.info["primary"] = True
+            return engine.sync_engine
+        writer = self.info.get("writer", None)
+        if writer is not None and _recent_writers.get(writer, 0) > time.monotonic():
+            self.info["primary"] = True
+            return engine.sync_engine
+        replica = self.info.get("replica", None)
+        if replica is None or replica not in replicas.healthy:
+            replica = replicas.choose()
+            if replica is None:
+                return engine.sync_engine
+            self.info["replica"] = replica
+        return replica.sync_engine
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_writer(session: Session) -> None:
+    writer = session.info.get("writer", None)
+    if replicas.engines and writer is not None and session.info.get("primary", False):
+        now = time.monotonic()
+        if len(_recent_writers) > 1000:
+            for key in [key for key, expires in _recent_writers.items() if expires <= now]:
+                del _recent_writers[key]
+        _recent_writers[writer] = now + config.db.read_your_writes_window
+
 
-engine = create_async_engine(config.db.url, echo=True)
 AsyncSessionFactory = async_sessionmaker(
     engine,
+    sync_session_class=RoutingSession,
     autoflush=False,
     expire_on_commit=False,
 )
 
 
+PARTITION_BY_GUILD: bool = getattr(config.db, "partition_by_guild", False)
+PARTITION_LOCK_KEY = advisory_key("ddl", "guild_partitions")
+
+
+def _guild_partition_ddl(partition: str, bounds: str) -> str:
+    table = PlayerSpecialization.__tablename__
+    return f'CREATE TABLE IF NOT EXISTS "{table}_{partition}" PARTITION OF "{table}" {bounds}'
+
+
+async def ensure_guild_partitions(guild_ids: list[int]) -> None:
+    if not PARTITION_BY_GUILD:
+        return
+    table = PlayerSpecialization.__tablename__
+    default = f"{table}_default"
+    for guild_id in map(int, guild_ids):
+        async with engine.begin() as conn:
+            # processes starting together would otherwise race on the same DDL
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+            exists = await conn.scalar(
+                text("SELECT 1 FROM pg_class WHERE relname = :name"), {"name": f"{table}_{guild_id}"}
+            )
+            if exists:
+                continue
+            # a guild with rows from before partitioning was enabled keeps them in the default partition, which
+            # rejects the new partition until they are moved into it
+            stranded = await conn.scalar(text(f'SELECT EXISTS (SELECT 1 FROM "{default}" WHERE guild_id = {guild_id})'))
+            if stranded:
+                await conn.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{default}"'))
+            await conn.execute(text(_guild_partition_ddl(str(guild_id), f"FOR VALUES IN ({guild_id})")))
+            if stranded:
+                await conn.execute(text(f'INSERT INTO "{table}" SELECT * FROM "{default}" WHERE guild_id = {guild_id}'))
+                await conn.execute(text(f'DELETE FROM "{default}" WHERE guild_id = {guild_id}'))
+                await conn.execute(text(f'ALTER TABLE "{table}" ATTACH PARTITION "{default}" DEFAULT'))
+
+
 async def init_db():
+    if PARTITION_BY_GUILD:
+        PlayerSpecialization.__table__.dialect_kwargs["postgresql_partition_by"] = "LIST (guild_id)"
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
+        if PARTITION_BY_GUILD:
+            await conn.execute(text(_guild_partition_ddl("default", "DEFAULT")))
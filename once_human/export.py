@@ -0,0 +1,125 @@
+import csv
+import io
+import json
+import zlib
+from collections.abc import AsyncIterator
+from typing import Any
+from typing import Optional
+
+from sqlalchemy import Select
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from once_human.models import Player
+from once_human.models import PlayerSpecialization
+from once_human.models import Scenario
+from once_human.models import Server
+from once_human.models import Specialization
+from once_human.models import User
+
+EXPORT_FORMATS = ("csv", "ndjson")
+LEVELS = tuple(range(5, 51, 5))
+COLUMNS = ("user_id", "username", "player", "server", "scenario", *[f"level_{level}" for level in LEVELS])
+CHUNK_SIZE = 64 * 1024
+
+
+def _export_stmt(guild_id: Optional[int], server_id: Optional[int], scenario_id: Optional[int]) -> Select:
+    stmt = (
+        select(
+            Player.id,
+            User.id,
+            User.username,
+            Player.name,
+            Server.name,
+            Scenario.name,
+            PlayerSpecialization.level,
+            Specialization.name,
+        )
+        .join(User, User.id == Player.user_id)
+        .outerjoin(Server, Server.id == Player.server_id)
+        .outerjoin(Scenario, Scenario.id == Server.scenario_id)
+        .outerjoin(PlayerSpecialization, PlayerSpecialization.player_id == Player.id)
+        .outerjoin(Specialization, Specialization.id == PlayerSpecialization.specialization_id)
+        .order_by(Player.id, PlayerSpecialization.level)
+    )
+    if guild_id is not None:
+        stmt = stmt.where(Player.guild_id == guild_id)
+    if server_id is not None:
+        stmt = stmt.where(Player.server_id == server_id)
+    if scenario_id is not None:
+        stmt = stmt.where(Server.scenario_id == scenario_id)
+    return stmt
+
+
+async def export_rows(
+    session: AsyncSession,
+    *,
+    guild_id: Optional[int] = None,
+    server_id: Optional[int] = None,
+    scenario_id: Optional[int] = None,
+    yield_per: int = 1000,
+) -> AsyncIterator[dict[str, Any]]:
+    stmt = _export_stmt(guild_id, server_id, scenario_id).execution_options(yield_per=yield_per)
+    current_id: Optional[int] = None
+    current: dict[str, Any] = {}
+    async for player_id, user_id, username, name, server, scenario, level, spec in await session.stream(stmt):
+        if player_id != current_id:
+            if current_id is not None:
+                yield current
+            current_id = player_id
+            current = dict.fromkeys(COLUMNS)
+            current.update(user_id=user_id, username=username, player=name, server=server, scenario=scenario)
+        if level is not None:
+            current[f"level_{level}"] = spec
+    if current_id is not None:
+        yield current
+
+
+def _csv_encoder():
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+
+    def encode(row: Optional[dict[str, Any]]) -> bytes:
+        if row is None:
+            writer.writeheader()
+        else:
+            writer.writerow(row)
+        data = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    return encode
+
+
+def _ndjson_encoder():
+    def encode(row: Optional[dict[str, Any]]) -> bytes:
+        if row is None:
+            return b""
+        return json.dumps(row, separators=(",", ":")).encode() + b"\n"
+
+    return encode
+
+
+async def export_chunks(session: AsyncSession, fmt: str, **filters: Optional[int]) -> AsyncIterator[bytes]:
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Export format must be one of {', '.join(EXPORT_FORMATS)}")
+    encode = _csv_encoder() if fmt == "csv" else _ndjson_encoder()
+    compressor = zlib.compressobj(wbits=31)
+    pending = [encode(None)]
+    pending_size = len(pending[0])
+    async for row in export_rows(session, **filters):
+        data = encode(row)
+        pending.append(data)
+        pending_size += len(data)
+        if pending_size >= CHUNK_SIZE:
+            chunk = compressor.compress(b"".join(pending))
+            pending.clear()
+            pending_size = 0
+            if chunk:
+                yield chunk
+    yield compressor.compress(b"".join(pending)) + compressor.flush()
+
+
+def export_filename(fmt: str) -> str:
+    return f"players.{fmt}.gz"
@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import time
+from collections.abc import AsyncIterator
+from collections.abc import Hashable
+from collections.abc import Iterable
+from contextlib import asynccontextmanager
+from contextlib import AsyncExitStack
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from once_human import metrics
+from once_human import repository
+
+type LockKey = tuple[str, int | str]
+
+ADVISORY_RETRY = 0.05
+SAVEPOINT = "edit_locks"
+
+
+def advisory_key(kind: str, value: int | str) -> int:
+    return int.from_bytes(hashlib.sha1(f"{kind}:{value}".encode()).digest()[:8], signed=True)
+
+
+class LockTimeout(Exception):
+    pass
+
+
+class KeyedLock:
+    def __init__(self, *, timeout: Optional[float] = None) -> None:
+        self.timeout = timeout
+        # lock and number of tasks holding or waiting for it, the entry goes away with the last one
+        self._locks: dict[Hashable, tuple[asyncio.Lock, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable, *, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        timeout = self.timeout if timeout is None else timeout
+        lock, refs = self._locks.get(key, None) or (asyncio.Lock(), 0)
+        self._locks[key] = (lock, refs + 1)
+        try:
+            if lock.locked():
+                metrics.lock_contention.inc("local")
+            started = time.perf_counter()
+            try:
+                async with asyncio.timeout(timeout):
+                    await lock.acquire()
+            except TimeoutError:
+                metrics.lock_contention.inc("local_timeout")
+                raise LockTimeout(f"Timed out waiting for {key}") from None
+            metrics.lock_wait_seconds.observe("local", value=time.perf_counter() - started)
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            lock, refs = self._locks[key]
+            if refs == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, refs - 1)
+
+
+class EditLocks:
+    # saves wait for locks before answering the interaction, so all waiting together stays well inside Discord's 3s
+    def __init__(self, *, timeout: float = 2) -> None:
+        self.timeout = timeout
+        self.local = KeyedLock()
+
+    @staticmethod
+    async def _advisory(session: AsyncSession, key: LockKey, deadline: float) -> None:
+        lock_key = advisory_key(*key)
+        if await repository.try_advisory_xact_lock(session, lock_key):
+            return
+        metrics.lock_contention.inc("advisory")
+        started = time.perf_counter()
+        # retried instead of pg_advisory_xact_lock, which cannot be given up on without ending the transaction
+        while not await repository.try_advisory_xact_lock(session, lock_key):
+            if time.monotonic() >= deadline:
+                metrics.lock_contention.inc("advisory_timeout")
+                raise LockTimeout(f"Timed out waiting for {key}")
+            await asyncio.sleep(ADVISORY_RETRY)
+        metrics.lock_wait_seconds.observe("advisory", value=time.perf_counter() - started)
+
+    @asynccontextmanager
+    async def saving(
+        self, session: AsyncSession, *, user_id: Optional[int] = None, player_ids: Iterable[Optional[int]] = ()
+    ) -> AsyncIterator[None]:
+        # always user before players and players in id order, so two savers can never wait on each other
+        keys: list[LockKey] = [("user", user_id)] if user_id is not None else []
+        keys.extend(("player", player_id) for player_id in sorted({pid for pid in player_ids if pid is not None}))
+        # advisory locks live in the transaction, which must be on the primary and ends with the caller's commit
+        session.info["primary"] = True
+        deadline = time.monotonic() + self.timeout
+        async with AsyncExitStack() as stack:
+            for key in keys:
+                await stack.enter_async_context(self.local.hold(key, timeout=max(0.0, deadline - time.monotonic())))
+            # a timed out save keeps its session open for another try, rolling back to the savepoint releases the
+            # advisory locks it already took
+            await repository.savepoint(session, SAVEPOINT)
+            try:
+                for key in keys:
+                    await self._advisory(session, key, deadline)
+            except LockTimeout:
+                await repository.rollback_to_savepoint(session, SAVEPOINT)
+                raise
+            await repository.release_savepoint(session, SAVEPOINT)
+            yield
+
+
+edit_locks = EditLocks()
+edit_lock_keys = metrics.Gauge(
+    "once_human_edit_lock_keys",
+    "Edit lock keys held or awaited in this process",
+    collect=lambda: {(): len(edit_locks.local)},
+)
@@ -0,0 +1,243 @@
+import asyncio
+import time
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Callable
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Optional
+
+from aiohttp import web
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from once_human.cache import caches
+from once_human.config import config
+
+type LabelValues = tuple[str, ...]
+type Sample = tuple[str, dict[str, str], float]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_sample(name: str, labels: dict[str, str], value: float) -> str:
+    if labels:
+        label_str = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels.items())
+        name = f"{name}{{{label_str}}}"
+    return f"{name} {value}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: "Metric") -> None:
+        self.metrics.append(metric)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(_format_sample(*sample) for sample in metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), *, registry: Registry = registry) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        registry.register(self)
+
+    def _labels(self, values: LabelValues) -> dict[str, str]:
+        return dict(zip(self.labels, values))
+
+    def samples(self) -> Iterator[Sample]:
+        return iter(())
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.values: dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self) -> Iterator[Sample]:
+        for label_values, value in self.values.items():
+            yield self.name, self._labels(label_values), value
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, *args, collect: Optional[Callable[[], dict[LabelValues, float]]] = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.values: dict[LabelValues, float] = {}
+        self.collect = collect
+
+    def set(self, *label_values: str, value: float) -> None:
+        self.values[label_values] = value
+
+    def samples(self) -> Iterator[Sample]:
+        values = self.collect() if self.collect else self.values
+        for label_values, value in values.items():
+            yield self.name, self._labels(label_values), value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, *args, buckets: tuple[float, ...] = DEFAULT_BUCKETS, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets = buckets
+        self.counts: dict[LabelValues, list[int]] = {}
+        self.sums: dict[LabelValues, float] = {}
+
+    def observe(self, *label_values: str, value: float) -> None:
+        counts = self.counts.get(label_values, None)
+        if counts is None:
+            counts = self.counts[label_values] = [0] * (len(self.buckets) + 1)
+            self.sums[label_values] = 0
+        counts[bisect_left(self.buckets, value)] += 1
+        self.sums[label_values] += value
+
+    def samples(self) -> Iterator[Sample]:
+        for label_values, counts in self.counts.items():
+            labels = self._labels(label_values)
+            cumulative = 0
+            for bound, count in zip([*self.buckets, "+Inf"], counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": str(bound)}, cumulative
+            yield f"{self.name}_sum", labels, self.sums[label_values]
+            yield f"{self.name}_count", labels, cumulative
+
+
+interactions = Counter("once_human_interactions_total", "View callbacks handled", ("view", "callback"))
+interaction_seconds = Histogram(
+    "once_human_interaction_seconds", "View callback latency including Discord responses", ("view", "callback")
+)
+pool_wait_seconds = Histogram(
+    "once_human_db_pool_wait_seconds", "Time spent waiting for a pooled connection", buckets=(0.001, *DEFAULT_BUCKETS)
+)
+loop_lag_seconds = Histogram(
+    "once_human_event_loop_lag_seconds", "Event loop scheduling delay", buckets=(0.001, *DEFAULT_BUCKETS)
+)
+rate_limits = Counter("once_human_discord_rate_limits_total", "Discord HTTP 429 responses", ("scope",))
+rate_limit_retry_after = Counter(
+    "once_human_discord_rate_limit_retry_after_seconds_total", "Seconds told to wait by Discord", ("scope",)
+)
+query_seconds = Histogram(
+    "once_human_db_query_seconds", "SQL statement execution time", buckets=(0.001, *DEFAULT_BUCKETS)
+)
+lock_wait_seconds = Histogram(
+    "once_human_lock_wait_seconds", "Time spent waiting for an edit lock", ("scope",), buckets=(0.001, *DEFAULT_BUCKETS)
+)
+lock_contention = Counter("once_human_lock_contention_total", "Edit lock requests that had to wait", ("scope",))
+cache_hit_ratio = Gauge(
+    "once_human_cache_hit_ratio",
+    "LRU cache hit ratio since start",
+    ("cache",),
+    collect=lambda: {(name,): cache.hit_ratio for name, cache in caches.items()},
+)
+cache_size = Gauge(
+    "once_human_cache_entries",
+    "LRU cache entries",
+    ("cache",),
+    collect=lambda: {(name,): len(cache) for name, cache in caches.items()},
+)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait_seconds.observe(value=time.perf_counter() - started)
+
+
+@dataclass(frozen=True)
+class SlowQuery:
+    at: float
+    seconds: float
+    statement: str
+
+
+class QueryTimer:
+    def __init__(self, *, slow_threshold: float = 0.1, keep: int = 50) -> None:
+        self.enabled = True
+        self.slow_threshold = slow_threshold
+        self.slow: deque[SlowQuery] = deque(maxlen=keep)
+
+    def instrument(self, engine: AsyncEngine) -> None:
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+            if self.enabled and context is not None:
+                context._query_started = time.perf_counter()
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+            started = getattr(context, "_query_started", None)
+            if started is None:
+                return
+            elapsed = time.perf_counter() - started
+            query_seconds.observe(value=elapsed)
+            if elapsed >= self.slow_threshold:
+                self.slow.append(SlowQuery(time.time(), elapsed, statement[:500]))
+
+
+query_timer = QueryTimer()
+
+
+class LoopLagProbe:
+    def __init__(self, interval: float = 0.1, *, keep: int = 3000) -> None:
+        self.interval = interval
+        self.last = 0.0
+        self.beat = time.monotonic()
+        self.recent: deque[float] = deque(maxlen=keep)
+
+    async def run(self) -> None:
+        while True:
+            self.beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.last = max(0.0, time.monotonic() - self.beat - self.interval)
+            self.recent.append(self.last)
+            loop_lag_seconds.observe(value=self.last)
+
+
+class MetricsServer:
+    def __init__(self, metrics_registry: Registry = registry) -> None:
+        self.registry = metrics_registry
+        self.app = web.Application()
+        self.app.add_routes([web.get("/metrics", self.metrics)])
+        self._runner: Optional[web.AppRunner] = None
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self, host: str = config.metrics.host, port: int = config.metrics.port) -> None:
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from datetime import datetime
+from itertools import chain
 from typing import Annotated
 from typing import Optional
 
@@ -7,13 +9,22 @@ from sqlalchemy import ARRAY
 from sqlalchemy import BigInteger
 from sqlalchemy import Column
 from sqlalchemy import ColumnElement
+from sqlalchemy import Computed
+from sqlalchemy import DateTime
+from sqlalchemy import delete
+from sqlalchemy import event
+from sqlalchemy import false
 from sqlalchemy import ForeignKey
 from sqlalchemy import func
 from sqlalchemy import Index
+from sqlalchemy import insert
+from sqlalchemy import inspect
 from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy import Table
+from sqlalchemy import Text
 from sqlalchemy import UniqueConstraint
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.ext.associationproxy import AssociationProxy
 from sqlalchemy.ext.hybrid import hybrid_property
@@ -23,6 +34,7 @@ from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
 from sqlalchemy.orm import registry
 from sqlalchemy.orm import relationship
+from sqlalchemy.orm import Session
 
 
 str_100 = Annotated[str, 100]
@@ -32,21 +44,36 @@ class Base(DeclarativeBase):
     registry = registry(type_annotation_map={str_100: String(100)})
 
 
+class Guild(Base):
+    __tablename__ = "guild"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    announcement_channel: Mapped[Optional[int]] = mapped_column(BigInteger)
+    user_role: Mapped[Optional[int]] = mapped_column(BigInteger)
+    admin_role: Mapped[Optional[int]] = mapped_column(BigInteger)
+
+
 class User(Base):
     __tablename__ = "user"
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
-    username: Mapped[str_100] = mapped_column(unique=True)
+    username: Mapped[str_100]
     display_name: Mapped[str_100]
     players: Mapped[list[Player]] = relationship(
         back_populates="user", cascade="all, delete-orphan", passive_deletes=True, order_by="Player.lower_name"
     )
 
+    # deferred so a batch of renames can swap usernames between rows and only has to be unique at commit
+    __table_args__ = (
+        UniqueConstraint("username", name=f"{__tablename__}_username_key", deferrable=True, initially="DEFERRED"),
+    )
+
 
 class Player(Base):
     __tablename__ = "player"
 
     id: Mapped[int] = mapped_column(primary_key=True)
+    guild_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("guild.id", ondelete="CASCADE"))
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("user.id", ondelete="CASCADE"))
     user: Mapped[User] = relationship(back_populates="players")
     name: Mapped[str_100] = mapped_column()
@@ -63,6 +90,12 @@ class Player(Base):
         "player_specializations", "specialization"
     )
 
+    # bumped by every ORM update and every build save, a writer holding an older version gets StaleDataError
+    version: Mapped[int] = mapped_column()
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
     @hybrid_property
     def lower_name(self) -> str:
         return self.name.lower()
@@ -72,7 +105,18 @@ class Player(Base):
     def _lower_name(cls) -> ColumnElement[str]:
         return func.lower(cls.name)
 
-    __table_args__ = (Index(f"{__tablename__}_user_id_lower_name_key", "user_id", func.lower(name), unique=True),)
+    __mapper_args__ = {"version_id_col": version}
+    __table_args__ = (
+        Index(f"{__tablename__}_guild_id_user_id_lower_name_key", "guild_id", "user_id", func.lower(name), unique=True),
+        Index(
+            f"{__tablename__}_guild_id_server_id_lower_name_idx",
+            "guild_id",
+            "server_id",
+            func.lower(name),
+            postgresql_include=["id", "name"],
+        ),
+        Index(f"{__tablename__}_updated_at_idx", "updated_at"),
+    )
 
 
 scenario_specializations = Table(
@@ -80,9 +124,19 @@ scenario_specializations = Table(
     Base.metadata,
     Column("scenario_id", ForeignKey("scenario.id", ondelete="CASCADE")),
     Column("specialization_id", ForeignKey("specialization.id", ondelete="CASCADE")),
+    Index("scenario_specializations_scenario_id_specialization_id_idx", "scenario_id", "specialization_id"),
 )
 
 
+class SpecializationLevel(Base):
+    __tablename__ = "specialization_level"
+
+    level: Mapped[int] = mapped_column(primary_key=True)
+    specialization_id: Mapped[int] = mapped_column(
+        ForeignKey("specialization.id", ondelete="CASCADE"), primary_key=True
+    )
+
+
 class Specialization(Base):
     __tablename__ = "specialization"
 
@@ -95,6 +149,16 @@ class Specialization(Base):
     identity: Mapped[str_100]
     description: Mapped[str]
     icon_url: Mapped[Optional[str]]
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', name), 'A') || "
+            "setweight(to_tsvector('english', category || ' ' || type || ' ' || affected), 'B') || "
+            "setweight(to_tsvector('english', description), 'C')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
     scenarios: Mapped[list[Scenario]] = relationship(
         secondary=scenario_specializations,
         back_populates="specializations",
@@ -109,16 +173,43 @@ class Specialization(Base):
     def _lower_name(cls) -> ColumnElement[str]:
         return func.lower(cls.name)
 
-    __table_args__ = (Index(f"{__tablename__}_lower_name_key", func.lower(name), unique=True),)
+    __table_args__ = (
+        Index(f"{__tablename__}_lower_name_key", func.lower(name), unique=True),
+        Index(f"{__tablename__}_search_vector_idx", "search_vector", postgresql_using="gin"),
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_specialization_levels(session: Session, flush_context) -> None:
+    specs = [
+        obj
+        for obj in chain(session.new, session.dirty)
+        if isinstance(obj, Specialization) and inspect(obj).attrs.levels.history.has_changes()
+    ]
+    if not specs:
+        return
+    conn = session.connection()
+    spec_ids = [spec.id for spec in specs]
+    conn.execute(delete(SpecializationLevel).where(SpecializationLevel.specialization_id.in_(spec_ids)))
+    rows = [{"level": level, "specialization_id": spec.id} for spec in specs for level in set(spec.levels)]
+    if rows:
+        conn.execute(insert(SpecializationLevel), rows)
 
 
 class PlayerSpecialization(Base):
     __tablename__ = "player_specialization"
     __table_args__ = (
-        UniqueConstraint("player_id", "level"),
-        UniqueConstraint("player_id", "specialization_id"),
+        UniqueConstraint("guild_id", "player_id", "specialization_id", deferrable=True, initially="DEFERRED"),
+        Index(
+            f"{__tablename__}_guild_spec_level_player_idx",
+            "guild_id",
+            "specialization_id",
+            "level",
+            "player_id",
+        ),
     )
 
+    guild_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
     player_id: Mapped[int] = mapped_column(ForeignKey("player.id", ondelete="CASCADE"), primary_key=True)
     player: Mapped[Player] = relationship(back_populates="player_specializations")
     level: Mapped[int] = mapped_column(primary_key=True)
@@ -162,6 +253,7 @@ class Server(Base):
     name: Mapped[str_100] = mapped_column()
     scenario_id: Mapped[int] = mapped_column(ForeignKey("scenario.id"))
     scenario: Mapped[Scenario] = relationship()
+    retired: Mapped[bool] = mapped_column(server_default=false())
 
     @hybrid_property
     def lower_name(self) -> str:
@@ -173,3 +265,41 @@ class Server(Base):
         return func.lower(cls.name)
 
     __table_args__ = (Index(f"{__tablename__}_lower_name_key", func.lower(name), unique=True),)
+
+
+# players moved out of the hot tables by the archival job, same ids so a restore puts them back unchanged
+class ArchivedPlayer(Base):
+    __tablename__ = "archived_player"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    guild_id: Mapped[int] = mapped_column(BigInteger)
+    user_id: Mapped[int] = mapped_column(BigInteger)
+    name: Mapped[str_100] = mapped_column()
+    server_id: Mapped[Optional[int]] = mapped_column()
+    version: Mapped[int] = mapped_column()
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    archived_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (Index(f"{__tablename__}_guild_id_user_id_idx", "guild_id", "user_id"),)
+
+
+class ArchivedPlayerSpecialization(Base):
+    __tablename__ = "archived_player_specialization"
+
+    guild_id: Mapped[int] = mapped_column(BigInteger)
+    player_id: Mapped[int] = mapped_column(ForeignKey("archived_player.id", ondelete="CASCADE"), primary_key=True)
+    level: Mapped[int] = mapped_column(primary_key=True)
+    specialization_id: Mapped[int] = mapped_column()
+
+
+class JobRun(Base):
+    __tablename__ = "job_run"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str_100] = mapped_column()
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    seconds: Mapped[float] = mapped_column()
+    outcome: Mapped[str] = mapped_column(String(20))
+    error: Mapped[Optional[str]] = mapped_column(Text)
+
+    __table_args__ = (Index(f"{__tablename__}_name_started_at_idx", "name", "started_at"),)
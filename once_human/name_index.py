@@ -0,0 +1,103 @@
+import heapq
+import re
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Iterable
+from typing import Optional
+
+from once_human.catalog import catalog
+from once_human.catalog import CatalogSnapshot
+
+WORD_RE = re.compile(r"\w+")
+MIN_SIMILARITY = 0.3
+
+
+def trigrams(text: str) -> set[str]:
+    grams: set[str] = set()
+    for word in WORD_RE.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NameIndex:
+    def __init__(self, entries: Iterable[tuple[str, int]]) -> None:
+        entries = sorted(entries, key=lambda entry: entry[0].lower())
+        self.names = [name for name, _ in entries]
+        self.ids = [entry_id for _, entry_id in entries]
+        self._keys = [name.lower() for name in self.names]
+        self._gram_counts: list[int] = []
+        postings: dict[str, list[int]] = {}
+        for i, key in enumerate(self._keys):
+            grams = trigrams(key)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        self._postings = {gram: tuple(indexes) for gram, indexes in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def prefix(self, text: str, limit: int) -> list[int]:
+        text = text.lower()
+        start = bisect_left(self._keys, text)
+        matches: list[int] = []
+        for i in range(start, min(start + limit, len(self._keys))):
+            if not self._keys[i].startswith(text):
+                break
+            matches.append(i)
+        return matches
+
+    def similar(self, text: str, limit: int) -> list[tuple[float, int]]:
+        grams = trigrams(text)
+        if not grams:
+            return []
+        shared: Counter[int] = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        scored = ((count / (len(grams) + self._gram_counts[i] - count), i) for i, count in shared.items())
+        return heapq.nlargest(limit, (entry for entry in scored if entry[0] >= MIN_SIMILARITY))
+
+    def search(self, text: str, limit: int = 25) -> list[str]:
+        matches = self.prefix(text, limit)
+        if len(matches) < limit and text.strip():
+            seen = set(matches)
+            matches.extend(i for _, i in self.similar(text, limit) if i not in seen)
+        return [self.names[i] for i in matches[:limit]]
+
+    def best(self, text: str) -> Optional[tuple[int, float]]:
+        key = text.strip().lower()
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return self.ids[i], 1.0
+        similar = self.similar(key, 1)
+        if not similar:
+            return None
+        score, i = similar[0]
+        return self.ids[i], score
+
+
+class CatalogNames:
+    def __init__(self) -> None:
+        self.scenarios = NameIndex([])
+        self.servers = NameIndex([])
+        self.specializations = NameIndex([])
+        self._scenario_specializations: dict[int, NameIndex] = {}
+
+    def rebuild(self, snapshot: CatalogSnapshot) -> None:
+        self.scenarios = NameIndex((scenario.name, scenario.id) for scenario in snapshot.scenarios.values())
+        self.servers = NameIndex((server.name, server.id) for server in snapshot.servers.values())
+        self.specializations = NameIndex((spec.name, spec.id) for spec in snapshot.specializations.values())
+        self._scenario_specializations = {
+            scenario.id: NameIndex(
+                (snapshot.specializations[spec_id].name, spec_id) for spec_id in scenario.specialization_ids
+            )
+            for scenario in snapshot.scenarios.values()
+        }
+
+    def scenario_specializations(self, scenario_id: int) -> NameIndex:
+        return self._scenario_specializations.get(scenario_id, None) or NameIndex([])
+
+
+catalog_names = CatalogNames()
+catalog.add_listener(catalog_names.rebuild)
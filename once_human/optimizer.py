@@ -0,0 +1,126 @@
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Optional
+
+LEVELS = tuple(range(5, 51, 5))
+
+
+def level_mask(levels: list[int]) -> int:
+    mask = 0
+    for level in levels:
+        mask |= 1 << LEVELS.index(level)
+    return mask
+
+
+def _bits(bitset: int):
+    while bitset:
+        low = bitset & -bitset
+        yield low.bit_length() - 1
+        bitset ^= low
+
+
+@dataclass
+class CoverageProblem:
+    spec_masks: dict[int, int]
+    builds: dict[int, dict[int, int]]
+
+
+@dataclass
+class Assignment:
+    player_id: int
+    level: int
+    old_spec_id: Optional[int]
+    new_spec_id: int
+
+
+@dataclass
+class CoverageResult:
+    assignments: list[Assignment] = field(default_factory=list)
+    uncovered: list[int] = field(default_factory=list)
+    complete: bool = True
+
+
+class _Solver:
+    def __init__(self, problem: CoverageProblem, deadline: float) -> None:
+        self.problem = problem
+        self.deadline = deadline
+        self.slots: list[tuple[int, int]] = []
+        self.level_slots = [0] * len(LEVELS)
+        self.holders: dict[int, int] = {spec_id: 0 for spec_id in problem.spec_masks}
+        empty = 0
+        for player_id, build in problem.builds.items():
+            for bit, level in enumerate(LEVELS):
+                index = len(self.slots)
+                self.slots.append((player_id, level))
+                self.level_slots[bit] |= 1 << index
+                spec_id = build.get(level, None)
+                if spec_id is None:
+                    empty |= 1 << index
+                elif spec_id in self.holders:
+                    self.holders[spec_id] += 1
+        self.empty = empty
+
+    def expired(self) -> bool:
+        return time.monotonic() > self.deadline
+
+    def candidates(self, spec_id: int) -> int:
+        slots = 0
+        for bit in _bits(self.problem.spec_masks[spec_id]):
+            slots |= self.level_slots[bit]
+        return slots
+
+    def _augment(self, spec_id: int, adjacency: dict[int, int], match: dict[int, int], seen: set[int]) -> bool:
+        for slot in _bits(adjacency[spec_id]):
+            if slot in seen:
+                continue
+            seen.add(slot)
+            owner = match.get(slot, None)
+            if owner is None or self._augment(owner, adjacency, match, seen):
+                match[slot] = spec_id
+                return True
+        return False
+
+    def solve(self) -> CoverageResult:
+        result = CoverageResult()
+        uncovered = [spec_id for spec_id, count in self.holders.items() if count == 0]
+        adjacency = {spec_id: self.candidates(spec_id) for spec_id in uncovered}
+        uncovered.sort(key=lambda spec_id: adjacency[spec_id].bit_count())
+
+        match: dict[int, int] = {}
+        empty_adjacency = {spec_id: slots & self.empty for spec_id, slots in adjacency.items()}
+        for spec_id in uncovered:
+            if self.expired():
+                result.complete = False
+                break
+            self._augment(spec_id, empty_adjacency, match, set())
+        for slot, spec_id in match.items():
+            player_id, level = self.slots[slot]
+            result.assignments.append(Assignment(player_id, level, None, spec_id))
+
+        matched = set(match.values())
+        for spec_id in uncovered:
+            if spec_id in matched:
+                continue
+            if self.expired():
+                result.complete = False
+                result.uncovered.append(spec_id)
+                continue
+            for slot in _bits(adjacency[spec_id] & ~self.empty):
+                if slot in match:
+                    continue
+                player_id, level = self.slots[slot]
+                old_spec_id = self.problem.builds[player_id][level]
+                if old_spec_id not in self.holders or self.holders[old_spec_id] > 1:
+                    if old_spec_id in self.holders:
+                        self.holders[old_spec_id] -= 1
+                    match[slot] = spec_id
+                    result.assignments.append(Assignment(player_id, level, old_spec_id, spec_id))
+                    break
+            else:
+                result.uncovered.append(spec_id)
+        return result
+
+
+def suggest_coverage(problem: CoverageProblem, budget: float) -> CoverageResult:
+    return _Solver(problem, time.monotonic() + budget).solve()
@@ -0,0 +1,92 @@
+import asyncio
+from collections import Counter
+from collections.abc import Iterable
+from itertools import groupby
+from operator import itemgetter
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from once_human import repository
+from once_human.cache import LRUCache
+
+type CooccurrenceMatrix = dict[int, Counter[int]]
+
+
+class Recommender:
+    def __init__(self, *, top_k: int = 3, cache_size: int = 1024) -> None:
+        self.top_k = top_k
+        self.cache: LRUCache[tuple, list[int]] = LRUCache(cache_size, name="recommendations")
+        self._matrices: dict[int, CooccurrenceMatrix] = {}
+        self._popularity: dict[int, Counter[int]] = {}
+        self._versions: dict[int, int] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+
+    def loaded(self, scenario_id: int) -> bool:
+        return scenario_id in self._matrices
+
+    @property
+    def scenario_ids(self) -> list[int]:
+        return list(self._matrices)
+
+    def version(self, scenario_id: int) -> int:
+        return self._versions.get(scenario_id, 0)
+
+    @staticmethod
+    def build_matrix(builds: Iterable[set[int]]) -> tuple[CooccurrenceMatrix, Counter[int]]:
+        matrix: CooccurrenceMatrix = {}
+        popularity: Counter[int] = Counter()
+        for build in builds:
+            popularity.update(build)
+            for spec_id in build:
+                matrix.setdefault(spec_id, Counter()).update(other for other in build if other != spec_id)
+        return matrix, popularity
+
+    def replace(self, scenario_id: int, matrix: CooccurrenceMatrix, popularity: Counter[int]) -> None:
+        self._matrices[scenario_id] = matrix
+        self._popularity[scenario_id] = popularity
+        self._versions[scenario_id] = self._versions.get(scenario_id, 0) + 1
+
+    async def load(self, session: AsyncSession, scenario_id: int) -> None:
+        async with self._locks.setdefault(scenario_id, asyncio.Lock()):
+            if self.loaded(scenario_id):
+                return
+            rows = await repository.scenario_build_rows(session, scenario_id)
+            builds = ({spec_id for _, spec_id in group} for _, group in groupby(rows, key=itemgetter(0)))
+            self.replace(scenario_id, *self.build_matrix(builds))
+
+    def update(self, scenario_id: int, old_build: set[int], new_build: set[int]) -> None:
+        if not self.loaded(scenario_id) or old_build == new_build:
+            return
+        matrix = self._matrices[scenario_id]
+        popularity = self._popularity[scenario_id]
+        for build, sign in ((old_build, -1), (new_build, 1)):
+            popularity.update({spec_id: sign for spec_id in build})
+            for spec_id in build:
+                row = matrix.setdefault(spec_id, Counter())
+                row.update({other: sign for other in build if other != spec_id})
+        self._versions[scenario_id] += 1
+
+    def suggest(self, scenario_id: int, level: int, build: frozenset[int], candidates: list[int]) -> list[int]:
+        if not self.loaded(scenario_id):
+            return []
+        key = (scenario_id, self._versions[scenario_id], level, build)
+        suggested = self.cache.get(key)
+        if suggested is not None:
+            return suggested
+
+        matrix = self._matrices[scenario_id]
+        scores: Counter[int] = Counter()
+        for spec_id in build:
+            scores.update(matrix.get(spec_id, {}))
+        popularity = self._popularity[scenario_id]
+        ranked = sorted(
+            (spec_id for spec_id in candidates if scores[spec_id] or popularity[spec_id]),
+            key=lambda spec_id: (scores[spec_id], popularity[spec_id]),
+            reverse=True,
+        )
+        suggested = ranked[: self.top_k]
+        self.cache.put(key, suggested)
+        return suggested
+
+
+recommender = Recommender()
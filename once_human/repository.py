@@ -0,0 +1,462 @@
+from typing import Optional
+
+from sqlalchemy import bindparam
+from sqlalchemy import delete
+from sqlalchemy import exists
+from sqlalchemy import func
+from sqlalchemy import literal
+from sqlalchemy import Row
+from sqlalchemy import select
+from sqlalchemy import text
+from sqlalchemy import tuple_
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
+
+from once_human.models import Guild
+from once_human.models import JobRun
+from once_human.models import Player
+from once_human.models import PlayerSpecialization
+from once_human.models import Scenario
+from once_human.models import scenario_specializations
+from once_human.models import Server
+from once_human.models import Specialization
+from once_human.models import SpecializationLevel
+from once_human.models import User
+
+type HolderCursor = tuple[int, str, int]
+type PlayerCursor = tuple[str, int]
+type UserRecord = tuple[int, str, str]
+
+
+# built once with bind parameters so every call hits the compiled cache and the asyncpg prepared statement
+USER_STMT = select(User).where(User.id == bindparam("user_id"))
+USER_PLAYERS_STMT = (
+    select(Player)
+    .where(Player.guild_id == bindparam("guild_id"), Player.user_id == bindparam("user_id"))
+    .order_by(Player.lower_name)
+    .options(selectinload(Player.player_specializations).selectinload(PlayerSpecialization.specialization))
+)
+SERVERS_STMT = select(Server).order_by(Server.name).options(selectinload(Server.scenario))
+SCENARIO_SPECS_STMT = (
+    select(SpecializationLevel.level, Specialization)
+    .join(Specialization, Specialization.id == SpecializationLevel.specialization_id)
+    .join(scenario_specializations, scenario_specializations.c.specialization_id == Specialization.id)
+    .where(scenario_specializations.c.scenario_id == bindparam("scenario_id"))
+    .order_by(SpecializationLevel.level, Specialization.lower_name)
+)
+SERVER_PLAYERS_STMT = (
+    select(Player)
+    .where(
+        Player.guild_id == bindparam("guild_id"),
+        Player.server_id == bindparam("server_id"),
+        Player.id.is_distinct_from(bindparam("player_id")),
+        tuple_(Player.lower_name, Player.id) > tuple_(bindparam("after_name"), bindparam("after_id")),
+    )
+    .order_by(Player.lower_name, Player.id)
+    .limit(bindparam("limit"))
+    .options(load_only(Player.id, Player.name))
+)
+
+
+async def user_with_builds(session: AsyncSession, user_id: int, guild_id: int) -> Optional[User]:
+    user = (await session.scalars(USER_STMT, {"user_id": user_id})).first()
+    if user:
+        players = await session.scalars(USER_PLAYERS_STMT, {"guild_id": guild_id, "user_id": user_id})
+        set_committed_value(user, "players", list(players.all()))
+    return user
+
+
+async def servers(session: AsyncSession) -> list[Server]:
+    return list((await session.scalars(SERVERS_STMT)).all())
+
+
+async def specs_by_level(session: AsyncSession, scenario_id: int) -> dict[int, list[Specialization]]:
+    specs: dict[int, list[Specialization]] = {}
+    for level, spec in await session.execute(SCENARIO_SPECS_STMT, {"scenario_id": scenario_id}):
+        specs.setdefault(level, []).append(spec)
+    return specs
+
+
+async def other_server_players(
+    session: AsyncSession, player: Player, *, after: PlayerCursor, limit: int
+) -> list[Player]:
+    # the browser pages in its own session while the player may be unflushed, so read through the relationship
+    # and let an unsaved player (no id yet) exclude nobody
+    if player.server is None:
+        return []
+    params = {
+        "guild_id": player.guild_id,
+        "server_id": player.server.id,
+        "player_id": player.id,
+        "after_name": after[0],
+        "after_id": after[1],
+        "limit": limit,
+    }
+    return list((await session.scalars(SERVER_PLAYERS_STMT, params)).all())
+
+
+async def user_player_by_name(session: AsyncSession, guild_id: int, user_id: int, name: str) -> Optional[Player]:
+    stmt = (
+        select(Player)
+        .where(Player.guild_id == guild_id, Player.user_id == user_id, Player.lower_name == name.lower())
+        .options(selectinload(Player.server))
+    )
+    return (await session.scalars(stmt)).first()
+
+
+async def server_by_name(session: AsyncSession, name: str) -> Optional[Server]:
+    return (await session.scalars(select(Server).where(Server.lower_name == name.lower()))).first()
+
+
+async def scenario_by_name(session: AsyncSession, name: str) -> Optional[Scenario]:
+    return (await session.scalars(select(Scenario).where(Scenario.lower_name == name.lower()))).first()
+
+
+async def specialization_by_name(session: AsyncSession, name: str) -> Optional[Specialization]:
+    stmt = select(Specialization).where(Specialization.lower_name == name.lower())
+    return (await session.scalars(stmt)).first()
+
+
+async def search_specializations(
+    session: AsyncSession,
+    query: str,
+    *,
+    scenario_id: Optional[int] = None,
+    level: Optional[int] = None,
+    limit: int = 10,
+) -> list[Row[tuple[int, str, str, float, str]]]:
+    ts_query = func.websearch_to_tsquery(literal("english").cast(REGCONFIG), query)
+    rank = func.ts_rank(Specialization.search_vector, ts_query)
+    headline = func.ts_headline(
+        literal("english").cast(REGCONFIG),
+        Specialization.description,
+        ts_query,
+        "StartSel=**, StopSel=**, MaxWords=20, MinWords=8",
+    )
+    stmt = (
+        select(Specialization.id, Specialization.name, Specialization.category, rank, headline)
+        .where(Specialization.search_vector.bool_op("@@")(ts_query))
+        .order_by(rank.desc(), Specialization.lower_name)
+        .limit(limit)
+    )
+    if scenario_id is not None:
+        stmt = stmt.where(
+            exists().where(
+                scenario_specializations.c.specialization_id == Specialization.id,
+                scenario_specializations.c.scenario_id == scenario_id,
+            )
+        )
+    if level is not None:
+        stmt = stmt.where(
+            exists().where(
+                SpecializationLevel.specialization_id == Specialization.id,
+                SpecializationLevel.level == level,
+            )
+        )
+    return list(await session.execute(stmt))
+
+
+async def spec_holders(
+    session: AsyncSession,
+    guild_id: int,
+    server_id: int,
+    specialization_id: int,
+    *,
+    after: Optional[HolderCursor] = None,
+    limit: int = 20,
+) -> list[Row[tuple[int, str, str, int]]]:
+    stmt = (
+        select(PlayerSpecialization.level, Player.name, Player.lower_name, Player.id)
+        .join(Player, Player.id == PlayerSpecialization.player_id)
+        .where(
+            PlayerSpecialization.guild_id == guild_id,
+            PlayerSpecialization.specialization_id == specialization_id,
+            Player.server_id == server_id,
+        )
+        .order_by(PlayerSpecialization.level, Player.lower_name, Player.id)
+        .limit(limit)
+    )
+    if after:
+        stmt = stmt.where(tuple_(PlayerSpecialization.level, Player.lower_name, Player.id) > tuple_(*after))
+    return list(await session.execute(stmt))
+
+
+async def server_builds(session: AsyncSession, guild_id: int, server_id: int) -> dict[int, tuple[str, dict[int, int]]]:
+    stmt = (
+        select(Player.id, Player.name, PlayerSpecialization.level, PlayerSpecialization.specialization_id)
+        .outerjoin(PlayerSpecialization, PlayerSpecialization.player_id == Player.id)
+        .where(Player.guild_id == guild_id, Player.server_id == server_id)
+    )
+    builds: dict[int, tuple[str, dict[int, int]]] = {}
+    for player_id, name, level, spec_id in await session.execute(stmt):
+        _, build = builds.setdefault(player_id, (name, {}))
+        if level is not None:
+            build[level] = spec_id
+    return builds
+
+
+async def scenario_build_rows(session: AsyncSession, scenario_id: int) -> list[Row[tuple[int, int]]]:
+    stmt = (
+        select(PlayerSpecialization.player_id, PlayerSpecialization.specialization_id)
+        .join(Player, Player.id == PlayerSpecialization.player_id)
+        .join(Server, Server.id == Player.server_id)
+        .where(Server.scenario_id == scenario_id)
+        .order_by(PlayerSpecialization.player_id)
+    )
+    return list(await session.execute(stmt))
+
+
+async def server_players_page(
+    session: AsyncSession,
+    guild_id: int,
+    server_id: int,
+    *,
+    after: Optional[PlayerCursor] = None,
+    limit: int = 100,
+) -> list[Row[tuple[int, str, str]]]:
+    stmt = (
+        select(Player.id, Player.name, Player.lower_name)
+        .where(Player.guild_id == guild_id, Player.server_id == server_id)
+        .order_by(Player.lower_name, Player.id)
+        .limit(limit)
+    )
+    if after:
+        stmt = stmt.where(tuple_(Player.lower_name, Player.id) > tuple_(*after))
+    return list(await session.execute(stmt))
+
+
+async def server_spec_holder_counts(
+    session: AsyncSession, guild_id: int, server_id: int, pairs: list[tuple[int, int]]
+) -> dict[tuple[int, int], int]:
+    if not pairs:
+        return {}
+    level_spec = tuple_(PlayerSpecialization.level, PlayerSpecialization.specialization_id)
+    stmt = (
+        select(PlayerSpecialization.level, PlayerSpecialization.specialization_id, func.count())
+        .join(Player, Player.id == PlayerSpecialization.player_id)
+        .where(PlayerSpecialization.guild_id == guild_id, Player.server_id == server_id, level_spec.in_(pairs))
+        .group_by(PlayerSpecialization.level, PlayerSpecialization.specialization_id)
+    )
+    return {(level, spec_id): count for level, spec_id, count in await session.execute(stmt)}
+
+
+async def player_builds(session: AsyncSession, player_ids: list[int]) -> dict[int, dict[int, int]]:
+    stmt = select(
+        PlayerSpecialization.player_id, PlayerSpecialization.level, PlayerSpecialization.specialization_id
+    ).where(PlayerSpecialization.player_id.in_(player_ids))
+    builds: dict[int, dict[int, int]] = {player_id: {} for player_id in player_ids}
+    for player_id, level, spec_id in await session.execute(stmt):
+        builds[player_id][level] = spec_id
+    return builds
+
+
+async def bump_player_version(session: AsyncSession, player: Player) -> None:
+    table = Player.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == player.id, table.c.version == player.version)
+        .values(version=table.c.version + 1, updated_at=func.now())
+        .returning(table.c.version)
+    )
+    version = (await session.execute(stmt)).scalar_one_or_none()
+    if version is None:
+        raise StaleDataError(f"Player {player.id} was changed by another session")
+    set_committed_value(player, "version", version)
+
+
+async def save_player_build(session: AsyncSession, player: Player, build: dict[int, int]) -> None:
+    await bump_player_version(session, player)
+    table = PlayerSpecialization.__table__
+    removed = delete(table).where(table.c.guild_id == player.guild_id, table.c.player_id == player.id)
+    if not build:
+        await session.execute(removed)
+        return
+    removed = removed.where(table.c.level.not_in(list(build))).returning(table.c.level)
+    stmt = insert(table).values(
+        [
+            {"guild_id": player.guild_id, "player_id": player.id, "level": level, "specialization_id": spec_id}
+            for level, spec_id in build.items()
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.guild_id, table.c.player_id, table.c.level],
+        set_={"specialization_id": stmt.excluded.specialization_id},
+        where=table.c.specialization_id != stmt.excluded.specialization_id,
+    ).add_cte(removed.cte("removed"))
+    await session.execute(stmt)
+
+
+def detach_player_build(session: AsyncSession, player: Player) -> None:
+    # shows the player as empty without queueing ORM deletes, the rows are removed later by save_player_build
+    for player_spec in list(player.player_specializations.values()):
+        session.expunge(player_spec)
+    set_committed_value(player, "player_specializations", {})
+
+
+async def reload_player_build(session: AsyncSession, player: Player) -> None:
+    for player_spec in list(player.player_specializations.values()):
+        session.expunge(player_spec)
+    await session.refresh(player, ["player_specializations"])
+
+
+async def guilds(session: AsyncSession) -> list[Guild]:
+    return list((await session.scalars(select(Guild))).all())
+
+
+async def ensure_guilds(session: AsyncSession, guild_ids: list[int]) -> None:
+    if guild_ids:
+        stmt = insert(Guild).values([{"id": guild_id} for guild_id in guild_ids]).on_conflict_do_nothing()
+        await session.execute(stmt)
+
+
+# the after_flush hook only sees ORM writes, specializations loaded with plain SQL get their level rows from here
+SYNC_SPECIALIZATION_LEVELS_SQL = text(
+    """
+    WITH expected AS (
+        SELECT DISTINCT unnest(levels) AS level, id AS specialization_id FROM specialization
+    ), removed AS (
+        DELETE FROM specialization_level
+        WHERE (level, specialization_id) NOT IN (SELECT level, specialization_id FROM expected)
+    )
+    INSERT INTO specialization_level (level, specialization_id)
+    SELECT level, specialization_id FROM expected
+    ON CONFLICT DO NOTHING
+    """
+)
+
+
+async def sync_specialization_levels(session: AsyncSession) -> None:
+    await session.execute(SYNC_SPECIALIZATION_LEVELS_SQL)
+
+
+USER_SYNC_TABLE = "user_sync"
+# usernames only change when someone renames, so a row that still holds a name now claimed by someone else is stale
+FREE_USERNAMES_SQL = text(
+    f"""
+    UPDATE "user" SET username = '#' || "user".id
+    FROM {USER_SYNC_TABLE} synced
+    WHERE "user".username = synced.username AND "user".id <> synced.id
+    """
+)
+UPSERT_USERS_SQL = text(
+    f"""
+    INSERT INTO "user" (id, username, display_name)
+    SELECT DISTINCT ON (id) id, username, display_name FROM {USER_SYNC_TABLE}
+    ON CONFLICT (id) DO UPDATE SET username = excluded.username, display_name = excluded.display_name
+    WHERE ("user".username, "user".display_name) IS DISTINCT FROM (excluded.username, excluded.display_name)
+    """
+)
+
+
+async def sync_users(session: AsyncSession, records: list[UserRecord]) -> int:
+    if not records:
+        return 0
+    conn = await session.connection()
+    await conn.execute(
+        text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {USER_SYNC_TABLE} "
+            "(id bigint, username varchar(100), display_name varchar(100)) ON COMMIT DELETE ROWS"
+        )
+    )
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        USER_SYNC_TABLE, records=records, columns=["id", "username", "display_name"]
+    )
+    await conn.execute(FREE_USERNAMES_SQL)
+    result = await conn.execute(UPSERT_USERS_SQL)
+    return result.rowcount
+
+
+async def seconds_since_job_run(session: AsyncSession, name: str) -> Optional[float]:
+    stmt = select(func.extract("epoch", func.now() - func.max(JobRun.started_at))).where(JobRun.name == name)
+    seconds = await session.scalar(stmt)
+    return float(seconds) if seconds is not None else None
+
+
+async def prune_job_runs(session: AsyncSession, days: int) -> int:
+    stmt = delete(JobRun).where(JobRun.started_at < func.now() - func.make_interval(0, 0, 0, days))
+    return (await session.execute(stmt)).rowcount
+
+
+async def try_advisory_xact_lock(session: AsyncSession, key: int) -> bool:
+    return await session.scalar(select(func.pg_try_advisory_xact_lock(key)))
+
+
+async def savepoint(session: AsyncSession, name: str) -> None:
+    await session.execute(text(f"SAVEPOINT {name}"))
+
+
+async def release_savepoint(session: AsyncSession, name: str) -> None:
+    await session.execute(text(f"RELEASE SAVEPOINT {name}"))
+
+
+async def rollback_to_savepoint(session: AsyncSession, name: str) -> None:
+    await session.execute(text(f"ROLLBACK TO SAVEPOINT {name}"))
+
+
+PLAYER_COLUMNS = "id, guild_id, user_id, name, server_id, version, updated_at"
+PLAYER_SPEC_COLUMNS = "guild_id, player_id, level, specialization_id"
+# one set-based chunk: SKIP LOCKED leaves players that are being edited for a later run
+ARCHIVE_PLAYERS_SQL = text(
+    f"""
+    WITH moved AS (
+        DELETE FROM player WHERE id IN (
+            SELECT player.id FROM player LEFT JOIN server ON server.id = player.server_id
+            WHERE player.updated_at < now() - make_interval(days => :inactive_days) OR server.retired
+            ORDER BY player.id
+            LIMIT :limit
+            FOR UPDATE OF player SKIP LOCKED
+        )
+        RETURNING {PLAYER_COLUMNS}
+    ), moved_specs AS (
+        DELETE FROM player_specialization USING moved
+        WHERE player_specialization.guild_id = moved.guild_id AND player_specialization.player_id = moved.id
+        RETURNING player_specialization.*
+    ), archived_specs AS (
+        INSERT INTO archived_player_specialization ({PLAYER_SPEC_COLUMNS})
+        SELECT {PLAYER_SPEC_COLUMNS} FROM moved_specs
+    )
+    INSERT INTO archived_player ({PLAYER_COLUMNS}) SELECT {PLAYER_COLUMNS} FROM moved
+    """
+)
+# restored players count as active again and drop servers retired since they were archived
+RESTORE_PLAYERS_SQL = text(
+    f"""
+    WITH moved AS (
+        DELETE FROM archived_player
+        WHERE guild_id = :guild_id AND user_id = :user_id
+            AND (CAST(:name AS text) IS NULL OR lower(name) = lower(CAST(:name AS text)))
+        RETURNING {PLAYER_COLUMNS}
+    ), moved_specs AS (
+        DELETE FROM archived_player_specialization USING moved
+        WHERE archived_player_specialization.player_id = moved.id
+        RETURNING archived_player_specialization.*
+    ), restored AS (
+        INSERT INTO player ({PLAYER_COLUMNS})
+        SELECT moved.id, moved.guild_id, moved.user_id, moved.name,
+            CASE WHEN server.retired THEN NULL ELSE moved.server_id END, moved.version, now()
+        FROM moved LEFT JOIN server ON server.id = moved.server_id
+        RETURNING name
+    ), restored_specs AS (
+        INSERT INTO player_specialization ({PLAYER_SPEC_COLUMNS})
+        SELECT {PLAYER_SPEC_COLUMNS} FROM moved_specs
+    )
+    SELECT name FROM restored ORDER BY lower(name)
+    """
+)
+
+
+async def archive_players(session: AsyncSession, *, inactive_days: int, limit: int) -> int:
+    result = await session.execute(ARCHIVE_PLAYERS_SQL, {"inactive_days": inactive_days, "limit": limit})
+    return result.rowcount
+
+
+async def restore_players(session: AsyncSession, guild_id: int, user_id: int, name: Optional[str] = None) -> list[str]:
+    params = {"guild_id": guild_id, "user_id": user_id, "name": name}
+    return list((await session.scalars(RESTORE_PLAYERS_SQL, params)).all())
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Awaitable
+from collections.abc import Callable
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import UTC
+from typing import Any
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from once_human import metrics
+from once_human import repository
+from once_human.locks import advisory_key
+from once_human.models import JobRun
+
+type JobFunc = Callable[[], Awaitable[None]]
+
+logger = logging.getLogger(__name__)
+
+job_seconds = metrics.Histogram("once_human_job_seconds", "Scheduled job runtime", ("job", "outcome"))
+
+
+@dataclass(frozen=True)
+class Job:
+    name: str
+    interval: float
+    func: JobFunc
+    # exclusive jobs run on one process per interval, local ones refresh per-process state and run everywhere
+    exclusive: bool = True
+
+
+class JobScheduler:
+    def __init__(
+        self, session_factory: async_sessionmaker, *, jitter: float = 0.1, executor: Optional[Executor] = None
+    ) -> None:
+        self.session_factory = session_factory
+        self.jitter = jitter
+        self.executor = executor
+        self.jobs: dict[str, Job] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    def add(self, name: str, interval: float, func: JobFunc, *, exclusive: bool = True) -> None:
+        self.jobs[name] = Job(name, interval, func, exclusive)
+
+    async def run_in_executor(self, func: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._loop(job)) for job in self.jobs.values()]
+
+    def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def _loop(self, job: Job) -> None:
+        # spread processes and jobs so they do not all hit the database at once after a deploy
+        await asyncio.sleep(random.uniform(0, job.interval * self.jitter))
+        while True:
+            try:
+                await self.run(job)
+            except Exception:
+                # the lock or the run record failed, so there is no job_run row to look at
+                logger.exception("Scheduled job %s could not be run", job.name)
+                job_seconds.observe(job.name, "unrecorded", value=0)
+            await asyncio.sleep(job.interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    async def run(self, job: Job) -> Optional[str]:
+        # the transaction holds the advisory lock while the job runs and releases it when the run is recorded
+        async with self.session_factory(info={"primary": True}) as session:
+            if job.exclusive:
+                if not await repository.try_advisory_xact_lock(session, advisory_key("job", job.name)):
+                    return None
+                since = await repository.seconds_since_job_run(session, job.name)
+                if since is not None and since < job.interval * (1 - self.jitter):
+                    return None
+            started_at = datetime.now(UTC)
+            started = time.perf_counter()
+            outcome, error = "ok", None
+            try:
+                await job.func()
+            except Exception as e:
+                outcome, error = "error", repr(e)
+            seconds = time.perf_counter() - started
+            job_seconds.observe(job.name, outcome, value=seconds)
+            session.add(JobRun(name=job.name, started_at=started_at, seconds=seconds, outcome=outcome, error=error))
+            await session.commit()
+        return outcome
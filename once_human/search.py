@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from once_human import repository
+from once_human.cache import LRUCache
+from once_human.catalog import catalog
+
+type SearchKey = tuple[str, Optional[int], Optional[int]]
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    id: int
+    name: str
+    category: str
+    rank: float
+    headline: str
+
+
+search_cache: LRUCache[SearchKey, list[SearchResult]] = LRUCache(256, name="search")
+catalog.add_listener(lambda snapshot: search_cache.clear())
+
+
+async def search_specializations(
+    session: AsyncSession, query: str, *, scenario_id: Optional[int] = None, level: Optional[int] = None
+) -> list[SearchResult]:
+    key = (" ".join(query.lower().split()), scenario_id, level)
+    results = search_cache.get(key)
+    if results is None:
+        rows = await repository.search_specializations(session, key[0], scenario_id=scenario_id, level=level)
+        results = [SearchResult(*row) for row in rows]
+        search_cache.put(key, results)
+    return results
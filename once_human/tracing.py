@@ -0,0 +1,201 @@
+import json
+import os
+import random
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import AbstractContextManager
+from contextlib import contextmanager
+from contextlib import nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from once_human.config import config
+
+SERVICE_NAME = "once_human"
+
+
+@dataclass(slots=True)
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    start: int
+    end: int = 0
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    trace: list["Span"] = field(default_factory=list, repr=False)
+
+    @property
+    def duration(self) -> float:
+        return (self.end - self.start) / 1e9
+
+
+# marks a context whose root was not sampled so nested spans stay no-ops instead of starting their own trace
+_UNSAMPLED = Span("", "", None, "unsampled", 0)
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def _new_id(size: int) -> str:
+    return random.getrandbits(size * 8).to_bytes(size).hex()
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict[str, Any]) -> list[dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def otlp_json(trace: list[Span]) -> dict[str, Any]:
+    spans = [
+        {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "parentSpanId": span.parent_id or "",
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start),
+            "endTimeUnixNano": str(span.end),
+            "attributes": _otlp_attributes(span.attributes),
+            "status": {"code": 2, "message": span.error} if span.error else {},
+        }
+        for span in trace
+    ]
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+                "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": spans}],
+            }
+        ]
+    }
+
+
+class Tracer:
+    def __init__(
+        self,
+        *,
+        sample_rate: float = 0.1,
+        ring_size: int = 1000,
+        path: Optional[str] = None,
+        flush_every: int = 50,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.path = path
+        self.flush_every = flush_every
+        self.sql = True
+        self.traces: deque[list[Span]] = deque(maxlen=ring_size)
+        self._buffer: list[str] = []
+
+    def _child(self, name: str, attributes: dict[str, Any]) -> Optional[Span]:
+        parent = _current.get()
+        if parent is None or parent is _UNSAMPLED:
+            return None
+        return Span(
+            parent.trace_id, _new_id(8), parent.span_id, name, time.time_ns(), attributes=attributes, trace=parent.trace
+        )
+
+    @contextmanager
+    def span(self, name: str, *, root: bool = False, **attributes: Any) -> Iterator[Optional[Span]]:
+        if root and _current.get() is None:
+            if random.random() < self.sample_rate:
+                span = Span(_new_id(16), _new_id(8), None, name, time.time_ns(), attributes=attributes)
+            else:
+                span = _UNSAMPLED
+        else:
+            span = self._child(name, attributes)
+        if span is None:
+            yield None
+            return
+        token = _current.set(span)
+        if span is _UNSAMPLED:
+            try:
+                yield None
+            finally:
+                _current.reset(token)
+            return
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            _current.reset(token)
+            self.finish(span)
+
+    def start(self, name: str, **attributes: Any) -> Optional[Span]:
+        return self._child(name, attributes)
+
+    def finish(self, span: Span) -> None:
+        span.end = time.time_ns()
+        span.trace.append(span)
+        if span.parent_id is not None:
+            return
+        self.traces.append(span.trace)
+        if self.path:
+            self._buffer.append(json.dumps(otlp_json(span.trace), separators=(",", ":")))
+            if len(self._buffer) >= self.flush_every:
+                self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a") as fp:
+            fp.write("\n".join(self._buffer) + "\n")
+        self._buffer.clear()
+
+    def instrument(self, engine: AsyncEngine) -> None:
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+            if self.sql and context is not None:
+                context._trace_span = self.start("sql", statement=statement[:500], executemany=executemany)
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+            span = getattr(context, "_trace_span", None)
+            if span is not None:
+                span.attributes["rows"] = cursor.rowcount
+                self.finish(span)
+
+        @event.listens_for(sync_engine, "handle_error")
+        def _error(exception_context) -> None:
+            span = getattr(exception_context.execution_context, "_trace_span", None)
+            if span is not None:
+                span.error = repr(exception_context.original_exception)
+                self.finish(span)
+
+
+tracer: Optional[Tracer] = None
+if config.tracing.enabled:
+    tracer = Tracer(
+        sample_rate=config.tracing.sample_rate,
+        ring_size=config.tracing.ring_size,
+        path=config.tracing.path,
+        flush_every=config.tracing.flush_every,
+    )
+
+
+def span(name: str, *, root: bool = False, **attributes: Any) -> AbstractContextManager[Optional[Span]]:
+    if tracer is None:
+        return nullcontext()
+    return tracer.span(name, root=root, **attributes)
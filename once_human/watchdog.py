@@ -0,0 +1,70 @@
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from types import FrameType
+from typing import Optional
+
+from once_human.metrics import LoopLagProbe
+
+# the wrapper intercept_interaction puts around every view callback, its locals name the running view and callback
+CALLBACK_FRAME = "set_interaction"
+
+
+@dataclass(frozen=True)
+class Stall:
+    at: float
+    lag: float
+    view: Optional[str]
+    callback: Optional[str]
+    stack: tuple[str, ...]
+
+
+def attribute(frame: Optional[FrameType]) -> tuple[Optional[str], Optional[str]]:
+    while frame is not None:
+        if frame.f_code.co_name == CALLBACK_FRAME:
+            view = frame.f_locals.get("view", None)
+            func = frame.f_locals.get("orig_func", None)
+            return type(view).__name__ if view is not None else None, getattr(func, "__name__", None)
+        frame = frame.f_back
+    return None, None
+
+
+class LoopWatchdog:
+    def __init__(
+        self, probe: LoopLagProbe, *, threshold: float = 0.25, max_findings: int = 100, stack_limit: int = 30
+    ) -> None:
+        self.probe = probe
+        self.threshold = threshold
+        self.stack_limit = stack_limit
+        self.findings: deque[Stall] = deque(maxlen=max_findings)
+        self._loop_thread: Optional[int] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._loop_thread = threading.get_ident()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _watch(self) -> None:
+        sampled_beat: Optional[float] = None
+        while not self._stopped.wait(self.threshold / 2):
+            beat = self.probe.beat
+            lag = time.monotonic() - beat - self.probe.interval
+            if lag < self.threshold or beat == sampled_beat:
+                continue
+            # one sample per stall, taken while the loop thread is still stuck in the offending code
+            sampled_beat = beat
+            frame = sys._current_frames().get(self._loop_thread, None)
+            if frame is None:
+                continue
+            view, callback = attribute(frame)
+            stack = tuple(traceback.format_stack(frame, limit=self.stack_limit))
+            self.findings.append(Stall(time.time(), lag, view, callback, stack))